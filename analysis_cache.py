@@ -0,0 +1,67 @@
+import json
+
+# Bump whenever build_game_analysis or ev_engine change what an analysis
+# contains, so results cached by older code get recomputed
+ENGINE_VERSION = 2
+
+# A game not seen for this long before the newest scrape has ended; twice the
+# longest interval between adaptive scrapes of a game (scrape_scheduler.py)
+RETIRED_AFTER_DAYS = 14
+
+# Latest scrape_time of every game that hasn't ended. Only a game's latest
+# snapshot has its last_seen moved up, so just those rows are read.
+LATEST_KEYS_QUERY = f'''
+    WITH latest AS (
+        SELECT s.name, s.scrape_time, COALESCE(s.last_seen, s.scrape_time) AS seen
+        FROM (SELECT name, MAX(scrape_time) AS scrape_time FROM snapshots GROUP BY name) l
+        JOIN snapshots s ON s.name = l.name AND s.scrape_time = l.scrape_time
+    )
+    SELECT name, scrape_time
+    FROM latest
+    WHERE seen >= (SELECT strftime('%Y-%m-%dT%H:%M:%S', MAX(seen), '-{RETIRED_AFTER_DAYS} days') FROM latest)
+'''
+
+EVICT_SQL = f'''DELETE FROM analysis_cache
+    WHERE engine_version != ?
+       OR (name, scrape_time) NOT IN ({LATEST_KEYS_QUERY})'''
+
+def init_cache_table(conn):
+    """Create the table holding each game's analysis for its latest snapshot"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS analysis_cache (
+        name TEXT NOT NULL,
+        scrape_time DATETIME NOT NULL,
+        engine_version INTEGER NOT NULL,
+        analysis TEXT NOT NULL,
+        PRIMARY KEY (name, scrape_time, engine_version)
+    ) WITHOUT ROWID''')
+
+def latest_scrape_times(conn):
+    """Map every game that hasn't ended to its latest scrape_time"""
+    return dict(conn.execute(LATEST_KEYS_QUERY).fetchall())
+
+def evict_stale(conn, full=False):
+    """Drop entries superseded by a newer snapshot, written by another engine
+    version, or for games that ended (see RETIRED_AFTER_DAYS) or no longer
+    have snapshots; full=True drops everything. Returns the number of
+    entries removed.
+    """
+    with conn:
+        if full:
+            return conn.execute('DELETE FROM analysis_cache').rowcount
+        return conn.execute(EVICT_SQL, (ENGINE_VERSION,)).rowcount
+
+def load_cached(conn):
+    """Return {name: analysis dict} for every entry left after evict_stale"""
+    rows = conn.execute('SELECT name, analysis FROM analysis_cache WHERE engine_version = ?',
+                        (ENGINE_VERSION,))
+    return {name: json.loads(analysis) for name, analysis in rows}
+
+def store_cached(conn, results, scrape_times):
+    """Cache freshly computed analyses under their game's latest scrape_time"""
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO analysis_cache (name, scrape_time, engine_version, analysis) '
+            'VALUES (?, ?, ?, ?)',
+            [(game['name'], scrape_times[game['name']], ENGINE_VERSION, json.dumps(game))
+             for game in results]
+        )
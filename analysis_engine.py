@@ -1,9 +1,16 @@
-import sqlite3
 import json
-from datetime import datetime
 import os
-import pandas as pd
-from db_handler import init_db
+import argparse
+from itertools import groupby
+from db_handler import connect, init_db
+from ev_engine import compute_game_metrics
+from probability_engine import compute_game_probabilities, BUNDLE_SIZES
+from history_materializer import materialize_history
+from parquet_export import EXPORT_DIR, export_history
+from slugs import generate_slug
+from publisher import Publisher
+from analysis_cache import (init_cache_table, latest_scrape_times, evict_stale,
+                            load_cached, store_cached)
 
 def calculate_ev(group):
     """Calculate expected value for a game"""
@@ -33,95 +40,168 @@ def calculate_ev(group):
         print(f"Error calculating EV: {str(e)}")
         return -ticket_cost  # Return negative ticket cost as fallback
 
-def analyze_scratchers(sort_mode=1, big_win_threshold=None):
-    """Core analysis function reading from database"""
-    conn = sqlite3.connect('scratcher_data.db')
+LATEST_SNAPSHOTS_TEMPLATE = '''
+    WITH latest AS (
+        SELECT name, MAX(scrape_time) AS scrape_time
+        FROM snapshots
+        {where}
+        GROUP BY name
+    )
+    SELECT s.id, s.name, s.cost, s.odds, s.image_url, s.scrape_time,
+           t.amount, t.total, t.remaining
+    FROM latest l
+    JOIN snapshots s ON s.name = l.name AND s.scrape_time = l.scrape_time
+    LEFT JOIN prize_tiers t ON t.snapshot_id = s.id
+    ORDER BY s.name, t.tier
+'''
+
+LATEST_SNAPSHOTS_QUERY = LATEST_SNAPSHOTS_TEMPLATE.format(where='')
+
+LATEST_SNAPSHOTS_FOR_NAMES_QUERY = LATEST_SNAPSHOTS_TEMPLATE.format(
+    where='WHERE name IN (SELECT value FROM json_each(?))'
+)
+
+def load_latest_snapshots(conn, names=None):
+    """Load every game's latest snapshot and its prize tiers in one query.
+
+    names restricts the load to those games. Returns a list of
+    (snapshot dict, prize tier list) pairs ordered by name.
+    """
+    snapshots = []
+    if names is None:
+        rows = conn.execute(LATEST_SNAPSHOTS_QUERY)
+    else:
+        rows = conn.execute(LATEST_SNAPSHOTS_FOR_NAMES_QUERY, (json.dumps(list(names)),))
+    for snapshot_id, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        _, name, cost, odds, image_url, scrape_time = group[0][:6]
+        snapshot = {
+            'id': snapshot_id,
+            'name': name,
+            'cost': cost,
+            'odds': odds,
+            'image_url': image_url,
+            'scrape_time': scrape_time
+        }
+        prize_tiers = [
+            {'amount': amount, 'total': total, 'remaining': remaining}
+            for amount, total, remaining in (row[6:] for row in group)
+            if amount is not None
+        ]
+        snapshots.append((snapshot, prize_tiers))
+    return snapshots
+
+def game_probabilities(probabilities, i, tier_offsets):
+    """Slice game i's rows out of probability_engine.compute_game_probabilities"""
+    game = {key: values[i] for key, values in probabilities.items() if key != 'tier_hit'}
+    game['tier_hit'] = probabilities['tier_hit'][tier_offsets[i]:tier_offsets[i + 1]]
+    return game
+
+def build_game_analysis(snapshot, prize_tiers, metrics=None, tier_shares=None, probabilities=None):
+    """Assemble the published analysis dict for one game snapshot.
+
+    metrics/tier_shares are this game's slice of ev_engine.compute_game_metrics
+    and probabilities its slice of compute_game_probabilities (see
+    game_probabilities); they are computed on the spot when not given.
+    """
+    if metrics is None or probabilities is None:
+        latest = [(snapshot, prize_tiers)]
+        snapshot_metrics, tier_metrics, tier_offsets = compute_game_metrics(latest)
+        metrics = {key: values[0] for key, values in snapshot_metrics.items()}
+        tier_shares = tier_metrics['percentage']
+        probabilities = game_probabilities(
+            compute_game_probabilities(latest, snapshot_metrics), 0, tier_offsets
+        )
+
+    return {
+        'name': snapshot['name'],
+        'cost': float(snapshot['cost']),
+        'current_odds': float(snapshot['odds']),
+        'jackpot': float(max(tier['amount'] for tier in prize_tiers)),
+        'prize_pool_remaining': float(metrics['prize_pool_remaining']),
+        'net_ev': float(metrics['net_ev']),
+        'ticket_data': {
+            'total_tickets': int(metrics['total_tickets']),
+            'remaining_tickets': int(metrics['remaining_tickets']),
+            'percent_remaining': float(metrics['percent_remaining']),
+            'total_winning': int(metrics['total_winning']),
+            'remaining_winning': int(metrics['remaining_winning'])
+        },
+        # Chances for a bundle of n tickets, one entry per size in 'tickets'
+        'probabilities': {
+            'tickets': list(BUNDLE_SIZES),
+            'any_win': [float(p) for p in probabilities['any_win']],
+            'break_even': [float(p) for p in probabilities['break_even']],
+            'winnings_variance': [float(v) for v in probabilities['winnings_variance']]
+        },
+        'prize_tiers': {
+            str(tier['amount']): {
+                'percentage': float(share),
+                'remaining': int(tier['remaining']),
+                'total': int(tier['total']),
+                'claimed': int(tier['total'] - tier['remaining']),
+                'hit_probability': [float(p) for p in hits]
+            }
+            for tier, share, hits in zip(prize_tiers, tier_shares, probabilities['tier_hit'])
+            if metrics['remaining_winning'] > 0
+        },
+        'image_url': snapshot['image_url']
+    }
+
+def analyze_snapshots(latest):
+    """Build the analysis dict for each (snapshot, prize_tiers) pair with tiers"""
+    for snapshot, prize_tiers in latest:
+        if not prize_tiers:
+            print(f"Error processing game {snapshot['name']}: no prize tiers")
+    latest = [(snapshot, prize_tiers) for snapshot, prize_tiers in latest if prize_tiers]
+    if not latest:
+        return []
+
+    # EV and ticket metrics for all games at once
+    snapshot_metrics, tier_metrics, tier_offsets = compute_game_metrics(latest)
+    probabilities = compute_game_probabilities(latest, snapshot_metrics)
+
+    results = []
+    for i, (snapshot, prize_tiers) in enumerate(latest):
+        try:
+            metrics = {key: values[i] for key, values in snapshot_metrics.items()}
+            tier_shares = tier_metrics['percentage'][tier_offsets[i]:tier_offsets[i + 1]]
+            results.append(build_game_analysis(snapshot, prize_tiers, metrics, tier_shares,
+                                               game_probabilities(probabilities, i, tier_offsets)))
+        except Exception as e:
+            print(f"Error processing game {snapshot['name']}: {str(e)}")
+            continue
+    return results
+
+def analyze_scratchers(sort_mode=1, big_win_threshold=None, full=False):
+    """Core analysis function reading from database.
+
+    Only games that haven't ended are analyzed (see
+    analysis_cache.RETIRED_AFTER_DAYS). Analyses are cached per (name,
+    scrape_time, engine version), so only games with a new latest snapshot
+    are recomputed; full=True ignores the cache and rebuilds it.
+    """
+    init_db()  # Adds last_seen, which tells which games have ended, to older databases
+    conn = connect()
     
     try:
-        # First, get all unique games with their latest scrape times
-        latest_games_query = '''
-            SELECT name, MAX(scrape_time) as latest_time
-            FROM scraper_data
-            GROUP BY name
-        '''
-        latest_games = pd.read_sql(latest_games_query, conn)
-        print(f"\nFound {len(latest_games)} games with their latest scrape times")
-        
-        # Process each game using its own latest scrape time
-        results = []
-        for _, game_row in latest_games.iterrows():
-            try:
-                game_name = game_row['name']
-                game_scrape_time = game_row['latest_time']
-                
-                print(f"\nProcessing game: {game_name}")
-                print(f"Latest scrape time for this game: {game_scrape_time}")
-                
-                # Get all game data including prize tiers
-                game_query = '''
-                    SELECT *
-                    FROM scraper_data 
-                    WHERE name = ? AND scrape_time = ?
-                '''
-                game_data = pd.read_sql(game_query, conn, params=(game_name, game_scrape_time))
-                
-                if game_data.empty:
-                    print(f"No data found for game: {game_name}")
-                    continue
-                
-                # Extract prize tiers
-                prize_tiers = get_prize_tiers(game_data.iloc[0])
-                
-                print(f"Prize tiers found: {len(prize_tiers)}")
-                print(f"Cost: ${game_data['cost'].iloc[0]}")
-                print(f"Odds: {game_data['odds'].iloc[0]}")
-                
-                # Calculate game metrics
-                total_remaining = sum(tier['remaining'] for tier in prize_tiers)
-                total_prizes = sum(tier['total'] for tier in prize_tiers)
-                prize_pool = sum(tier['amount'] * tier['remaining'] for tier in prize_tiers)
-                
-                game_totals = calculate_game_totals(prize_tiers, float(game_data['odds'].iloc[0]))
-                
-                analysis = {
-                    'name': game_name,
-                    'cost': float(game_data['cost'].iloc[0]),
-                    'current_odds': float(game_data['odds'].iloc[0]),
-                    'jackpot': float(max(tier['amount'] for tier in prize_tiers)),
-                    'prize_pool_remaining': float(prize_pool),
-                    'net_ev': calculate_ev_new(
-                        game_data['cost'].iloc[0],
-                        game_data['odds'].iloc[0],
-                        prize_tiers
-                    ),
-                    'ticket_data': {
-                        'total_tickets': game_totals['total_tickets'],
-                        'remaining_tickets': game_totals['remaining_tickets'],
-                        'percent_remaining': game_totals['percent_remaining'],
-                        'total_winning': game_totals['total_winning'],
-                        'remaining_winning': game_totals['remaining_winning']
-                    },
-                    'prize_tiers': {
-                        str(tier['amount']): {
-                            'percentage': (tier['remaining'] / game_totals['remaining_winning']) * 100,
-                            'remaining': int(tier['remaining']),
-                            'total': int(tier['total']),
-                            'claimed': int(tier['total'] - tier['remaining'])
-                        }
-                        for tier in prize_tiers
-                        if game_totals['remaining_winning'] > 0
-                    },
-                    'image_url': game_data['image_url'].iloc[0]
-                }
-                
-                results.append(analysis)
-                print(f"Successfully processed game: {game_name}")
-                print(f"Prize tiers: {len(analysis['prize_tiers'])}")
-                print(f"Jackpot: ${analysis['jackpot']}")
-                
-            except Exception as e:
-                print(f"Error processing game {game_name}: {str(e)}")
-                continue
+        init_cache_table(conn)
+        scrape_times = latest_scrape_times(conn)
+        print(f"\nFound {len(scrape_times)} active games with their latest scrape times")
+
+        evicted = evict_stale(conn, full=full)
+        cached = load_cached(conn)
+        changed = [name for name in scrape_times if name not in cached]
+        print(f"Reusing {len(cached)} cached analyses, analyzing {len(changed)} games "
+              f"({evicted} stale cache entries dropped)")
+
+        # The changed games' latest snapshots and tiers come back from a single query
+        fresh = analyze_snapshots(load_latest_snapshots(conn, changed)) if changed else []
+        store_cached(conn, fresh, scrape_times)
+
+        analyses = dict(cached)
+        analyses.update((game['name'], game) for game in fresh)
+        results = [analyses[name] for name in sorted(analyses)]
         
         print(f"\nSuccessfully analyzed {len(results)} games")
         return results
@@ -167,24 +247,6 @@ def calculate_prize_tiers(group, remaining_winning):
         for _, row in group.iterrows()
     }
 
-def get_prize_tiers(game_data):
-    """Extract prize tiers from game data, ignoring NULL values"""
-    tiers = []
-    for i in range(1, 21):
-        amount = game_data[f'prize{i}_amount']
-        total = game_data[f'prize{i}_total']
-        remaining = game_data[f'prize{i}_remaining']
-        
-        # Only include non-NULL tiers
-        if amount is not None and total is not None and remaining is not None:
-            tiers.append({
-                'amount': amount,
-                'total': total,
-                'remaining': remaining
-            })
-    
-    return tiers
-
 def calculate_game_totals(prize_tiers, odds):
     """Calculate total and remaining ticket counts"""
     total_winning = sum(tier['total'] for tier in prize_tiers)
@@ -195,7 +257,10 @@ def calculate_game_totals(prize_tiers, odds):
     claimed_winning = total_winning - remaining_winning
     
     # Estimate remaining tickets using same proportion
-    remaining_tickets = int(float((remaining_winning / total_winning) * total_tickets))
+    if total_winning > 0:
+        remaining_tickets = int(float((remaining_winning / total_winning) * total_tickets))
+    else:
+        remaining_tickets = 0
     
     return {
         'total_tickets': int(total_tickets),
@@ -206,14 +271,31 @@ def calculate_game_totals(prize_tiers, odds):
         'percent_remaining': (remaining_tickets / total_tickets) * 100 if total_tickets > 0 else 0
     }
 
-def generate_website_data():
-    """Generate all website data files"""
+# Fields app.js renders on the game cards
+INDEX_FIELDS = ('name', 'cost', 'current_odds', 'jackpot', 'net_ev', 'image_url')
+
+def write_game_shards(games, publisher):
+    """Publish index.json with the card fields of every game plus games/<slug>.json per game"""
+    index = []
+    for game in games:
+        slug = generate_slug(game['name'])
+        index.append(dict({field: game[field] for field in INDEX_FIELDS}, slug=slug))
+        publisher.publish(f"games/{slug}.json", dict(game, slug=slug))
+    publisher.publish('index.json', index)
+    print(f"\nPublished index.json and {len(games)} game files")
+
+def generate_website_data(rebuild_history=False, full=False, export_dir=None):
+    """Generate all website data files.
+
+    export_dir, if given, also gets the snapshot history as monthly Parquet
+    partitions (see parquet_export.py); full=True rewrites all of them.
+    """
     try:
         os.makedirs('public/web_data', exist_ok=True)
         
         # Run analysis and get results directly as list
         print("\nStarting analysis...")
-        current_data = analyze_scratchers()
+        current_data = analyze_scratchers(full=full)
         
         if not current_data:
             print("Warning: No games were analyzed!")
@@ -228,51 +310,42 @@ def generate_website_data():
             print(f"Prize tiers: {len(game['prize_tiers'])}")
             print("---")
         
-        # Save current analysis
-        with open('public/web_data/current_analysis.json', 'w') as f:
-            json.dump(current_data, f, indent=2)
-            print(f"\nWrote {len(current_data)} games to current_analysis.json")
-        
-        # Generate historical data
-        conn = sqlite3.connect('scratcher_data.db')
-        historical_data = {}
-        
-        print("\nGenerating historical data...")
-        for game in current_data:
-            game_name = game['name']
-            history = pd.read_sql('''
-                SELECT 
-                    timestamp as date,
-                    remaining_prizes,
-                    prize_pool as prize_pool_remaining
-                FROM scratchers 
-                WHERE name = ? 
-                ORDER BY timestamp
-            ''', conn, params=(game_name,))
-            historical_data[game_name] = history.to_dict('records')
-            print(f"Added historical data for {game_name}: {len(history)} records")
-        
-        with open('public/web_data/historical.json', 'w') as f:
-            json.dump(historical_data, f, indent=2)
-            print(f"\nWrote historical data for {len(historical_data)} games")
+        # Publish the card index and one file per game for the site
+        publisher = Publisher('public/web_data')
+        write_game_shards(current_data, publisher)
+
+        # Full analysis in one file for other consumers, under its usual name
+        publisher.publish('current_analysis.json', current_data, hashed=False)
         
-        # Generate sitemap
-        sitemap = {
-            'last_updated': datetime.utcnow().isoformat(),
-            'games': [game['name'] for game in current_data]
-        }
+        # Append new snapshots to the per-game history files
+        print("\nUpdating historical data...")
+        materialize_history(rebuild=rebuild_history)
+
+        if export_dir:
+            print("\nExporting history to Parquet...")
+            try:
+                export_history(export_dir, full=full)
+            except Exception as e:
+                # The export is a side output; the site still gets published
+                print(f"Parquet export failed: {str(e)}")
         
-        with open('public/web_data/sitemap.json', 'w') as f:
-            json.dump(sitemap, f, indent=2)
-            print("\nGenerated sitemap.json")
+        # Generate sitemap, including the manifest of published files
+        publisher.finish(games=[game['name'] for game in current_data])
+        print("\nGenerated sitemap.json")
         
         print("\nWebsite data generation completed successfully")
         
     except Exception as e:
         print(f"Error generating website data: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 if __name__ == "__main__":
-    generate_website_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyze scratcher data and generate website data")
+    parser.add_argument("--rebuild-history", action='store_true',
+                        help="Regenerate the per-game history files from all snapshots")
+    parser.add_argument("--full", action='store_true',
+                        help="Recompute every game instead of reusing cached analyses")
+    parser.add_argument("--export-parquet", nargs='?', const=EXPORT_DIR, metavar='DIR',
+                        help=f"Also export snapshot history as monthly Parquet partitions (default DIR {EXPORT_DIR})")
+    args = parser.parse_args()
+
+    generate_website_data(rebuild_history=args.rebuild_history, full=args.full, export_dir=args.export_parquet)
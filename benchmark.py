@@ -0,0 +1,220 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing, nullcontext, redirect_stdout
+from datetime import datetime, timedelta
+from functools import partial
+
+import db_handler
+from db_handler import init_db, ScraperDataWriter, store_scraper_data
+from analysis_engine import (analyze_scratchers, calculate_ev_new, generate_website_data,
+                             load_latest_snapshots)
+from ev_engine import ev_history
+
+COSTS = (1, 2, 3, 5, 10, 20, 30, 50)
+START_DATE = datetime(2022, 1, 1, 12)
+EV_HISTORY_BUDGET = 1.0   # Seconds per million prize tier rows for a full EV history
+
+def synthetic_games(games, tiers, seed=0):
+    """Build game definitions: cost, odds, prize amounts and per-tier sell-through rates"""
+    rng = random.Random(seed)
+    definitions = []
+    for g in range(games):
+        cost = rng.choice(COSTS)
+        # Prizes grow geometrically from the ticket price to 20,000x it, rarer as they grow
+        amounts = []
+        for i in range(tiers):
+            amount = float(round(cost * 20000 ** (i / max(tiers - 1, 1))))
+            amounts.append(max(amount, amounts[-1] + cost) if amounts else amount)
+        amounts.reverse()
+        totals = [max(1, int(2_000_000 / (amount / cost) ** 1.2 / tiers)) for amount in amounts]
+        lifetime = rng.uniform(300, 1500)
+        definitions.append({
+            'name': f"Synthetic Game {g:04d}",
+            'cost': float(cost),
+            'odds': round(rng.uniform(2.5, 5.0), 2),
+            'image_url': f"https://example.com/games/{g}.png",
+            'prize_amounts': amounts,
+            'total_prizes': totals,
+            'rates': [rng.uniform(0.8, 1.2) / lifetime for _ in amounts]
+        })
+    return definitions
+
+def synthetic_snapshot(game, day):
+    """The scraper result for one game on one day, in scrape_game_details' format"""
+    return {
+        'name': game['name'],
+        'cost': game['cost'],
+        'odds': game['odds'],
+        'image_url': game['image_url'],
+        'prize_amounts': game['prize_amounts'],
+        'total_prizes': game['total_prizes'],
+        'remaining_prizes': [
+            int(total * max(0.0, 1.0 - rate * day))
+            for total, rate in zip(game['total_prizes'], game['rates'])
+        ],
+        'scrape_time': (START_DATE + timedelta(days=day)).isoformat()
+    }
+
+def populate(definitions, days):
+    """Write every game's daily snapshots in scrape order; returns the number written"""
+    with ScraperDataWriter() as writer:
+        for day in range(days):
+            for game in definitions:
+                writer.add(synthetic_snapshot(game, day))
+    if writer.failed:
+        raise RuntimeError(f"{len(writer.failed)} synthetic snapshots failed to write")
+    return len(writer.written)
+
+def store_one_by_one(definitions, day, count):
+    """Store one more day for the first `count` games through store_scraper_data"""
+    for game in definitions[:count]:
+        if not store_scraper_data(synthetic_snapshot(game, day)):
+            raise RuntimeError(f"store_scraper_data failed for {game['name']}")
+    return count
+
+def evaluate_ev():
+    """Run calculate_ev_new over every game's latest snapshot"""
+    with closing(db_handler.connect()) as conn:
+        latest = load_latest_snapshots(conn)
+    for snapshot, prize_tiers in latest:
+        calculate_ev_new(snapshot['cost'], snapshot['odds'], prize_tiers)
+    return len(latest)
+
+def full_ev_history():
+    """Compute net EV for every stored snapshot with ev_engine.ev_history"""
+    with closing(db_handler.connect()) as conn:
+        return len(ev_history(conn))
+
+def run_stage(results, name, fn, *args, memory=True, verbose=False):
+    """Time fn(*args), record its peak traced memory, and store both under results[name]"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with nullcontext() if verbose else redirect_stdout(io.StringIO()):
+        items = fn(*args)
+    seconds = time.perf_counter() - start
+    stage = {'seconds': round(seconds, 4)}
+    if memory:
+        stage['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    if isinstance(items, list):
+        items = len(items)
+    if isinstance(items, int) and items:
+        stage['items'] = items
+        stage['per_item_ms'] = round(seconds / items * 1000, 4)
+    results[name] = stage
+    peak = f"{stage['peak_mb']:9.1f} MB" if memory else ''
+    print(f"{name:<28}{seconds:9.3f}s{peak}")
+    return items
+
+def compare(stages, baseline, tolerance):
+    """Return [(stage, baseline seconds, seconds)] for stages slower than tolerance x the baseline"""
+    regressions = []
+    for name, stage in stages.items():
+        before = baseline.get('stages', {}).get(name)
+        if before and before['seconds'] > 0 and stage['seconds'] > before['seconds'] * tolerance:
+            regressions.append((name, before['seconds'], stage['seconds']))
+    return regressions
+
+def over_budget(results):
+    """[(stage, budget seconds, seconds)] for stages slower than their fixed budget"""
+    stage = results['stages'].get('ev_history')
+    if not stage or 'items' not in stage:
+        return []
+    budget = EV_HISTORY_BUDGET * stage['items'] * results['params']['tiers'] / 1_000_000
+    return [('ev_history', budget, stage['seconds'])] if stage['seconds'] > budget else []
+
+def run_benchmark(games, tiers, days, store_calls, seed=0, memory=True, verbose=False, keep=None):
+    """Build a synthetic database in a scratch directory and time each pipeline stage"""
+    workdir = tempfile.mkdtemp(prefix='scratcha-bench-')
+    cwd, db_path = os.getcwd(), db_handler.DB_PATH
+    stages = {}
+    try:
+        # The pipeline writes to DB_PATH and ./public, so both live in the scratch dir
+        os.chdir(workdir)
+        db_handler.DB_PATH = os.path.join(workdir, 'scratcher_data.db')
+        init_db()
+
+        definitions = synthetic_games(games, tiers, seed)
+        print(f"{games} games x {tiers} tiers x {days} days in {workdir}\n")
+        run_stage(stages, 'ingest_batched', populate, definitions, days, memory=memory, verbose=verbose)
+        run_stage(stages, 'store_scraper_data', store_one_by_one, definitions, days,
+                  min(store_calls, games), memory=memory, verbose=verbose)
+        run_stage(stages, 'analyze_scratchers_full', partial(analyze_scratchers, full=True),
+                  memory=memory, verbose=verbose)
+        run_stage(stages, 'analyze_scratchers_cached', analyze_scratchers,
+                  memory=memory, verbose=verbose)
+        run_stage(stages, 'calculate_ev_new', evaluate_ev, memory=memory, verbose=verbose)
+        run_stage(stages, 'ev_history', full_ev_history, memory=memory, verbose=verbose)
+        run_stage(stages, 'generate_website_data_cold', generate_website_data,
+                  memory=memory, verbose=verbose)
+        run_stage(stages, 'generate_website_data_warm', generate_website_data,
+                  memory=memory, verbose=verbose)
+        db_size = os.path.getsize(db_handler.DB_PATH)
+    finally:
+        os.chdir(cwd)
+        db_handler.DB_PATH = db_path
+        if keep:
+            shutil.move(workdir, keep)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'games': games, 'tiers': tiers, 'days': days,
+                   'store_calls': store_calls, 'seed': seed, 'tracemalloc': memory},
+        'db_bytes': db_size,
+        'stages': stages
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest, analysis and publishing on synthetic data")
+    parser.add_argument("--games", type=int, default=200, help="Number of synthetic games")
+    parser.add_argument("--tiers", type=int, default=20, help="Prize tiers per game")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Daily snapshots per game")
+    parser.add_argument("--store-calls", type=int, default=50,
+                        help="Games stored one at a time through store_scraper_data")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic games")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Flag stages slower than this multiple of the baseline (default 1.5)")
+    parser.add_argument("--no-memory", action='store_true',
+                        help="Skip tracemalloc, which slows allocation-heavy stages")
+    parser.add_argument("--keep", help="Move the scratch directory (database and public/) here afterwards")
+    parser.add_argument("--verbose", action='store_true', help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.games, args.tiers, args.days, args.store_calls, seed=args.seed,
+                            memory=not args.no_memory, verbose=args.verbose, keep=args.keep)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    over = over_budget(results)
+    for name, budget, seconds in over:
+        print(f"OVER BUDGET {name}: {seconds:.3f}s, budget {budget:.3f}s "
+              f"({EV_HISTORY_BUDGET}s per million prize tiers)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results['stages'], json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f}s -> {after:.3f}s")
+        if not regressions:
+            print(f"No stage slower than {args.tolerance}x the baseline")
+    else:
+        regressions = []
+    if over or regressions:
+        sys.exit(1)
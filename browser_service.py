@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import time
+import urllib.request
+from datetime import datetime
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from lean_browser import LEAN_ARGUMENTS
+
+SERVICE_DIR = '.browser-service'
+STATE_FILE = 'service.json'
+EVENTS_FILE = 'events.jsonl'
+DRIVER_CACHE = '.chromedriver.json'
+BASE_PORT = 9300
+RECYCLE_AFTER = 200        # Pages a browser serves before it is restarted
+HEALTH_INTERVAL = 10       # Seconds between health checks
+STARTUP_TIMEOUT = 30
+
+CHROME_ARGUMENTS = [
+    '--headless=new',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--window-size=1920,1080',
+    '--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
+]
+
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+def pinned_driver_path(refresh=False):
+    """Path of the chromedriver to use, resolved over the network only once.
+
+    CHROMEDRIVER_PATH wins if set; otherwise the path webdriver-manager
+    installed last time is reused until refresh=True or the file is gone.
+    """
+    if os.getenv('CHROMEDRIVER_PATH'):
+        return os.environ['CHROMEDRIVER_PATH']
+    if not refresh:
+        try:
+            with open(DRIVER_CACHE) as f:
+                path = json.load(f)['path']
+            if os.path.exists(path):
+                return path
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(DRIVER_CACHE, 'w') as f:
+        json.dump({'path': path, 'pinned_at': datetime.utcnow().isoformat()}, f, indent=2)
+    return path
+
+def _path(name):
+    return os.path.join(SERVICE_DIR, name)
+
+def _log_event(event, **fields):
+    os.makedirs(SERVICE_DIR, exist_ok=True)
+    with open(_path(EVENTS_FILE), 'a') as f:
+        f.write(json.dumps(dict(time=datetime.utcnow().isoformat(), event=event, **fields)) + '\n')
+
+def _read_state():
+    try:
+        with open(_path(STATE_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'browsers': []}
+
+def _write_state(state):
+    os.makedirs(SERVICE_DIR, exist_ok=True)
+    tmp = _path(STATE_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, _path(STATE_FILE))
+
+def healthy(port, timeout=1.0):
+    """Whether the browser on port answers on its DevTools endpoint"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, TypeError):
+        return False
+
+# Leases: <port>.lease holds the pid of the process using that browser
+
+def acquire_lease(port):
+    """Claim the browser on port for this process; False if someone else holds it"""
+    path = _path(f"{port}.lease")
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path) as f:
+                    holder = int(f.read() or 0)
+            except (FileNotFoundError, ValueError):
+                holder = 0
+            if _pid_alive(holder):
+                return False
+            # The holder died without releasing it
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+def release_lease(port):
+    try:
+        os.remove(_path(f"{port}.lease"))
+    except FileNotFoundError:
+        pass
+
+def pages_served(port):
+    try:
+        with open(_path(f"{port}.pages")) as f:
+            return int(f.read() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def _set_pages(port, pages):
+    with open(_path(f"{port}.pages"), 'w') as f:
+        f.write(str(pages))
+
+class AttachedChrome(webdriver.Chrome):
+    """A WebDriver attached to one of the service's warm browsers.
+
+    Adds each page it loads to the browser's count as it goes, and on quit()
+    hands the browser back to the service instead of closing it. Once
+    exhausted, the caller should quit and attach again so the service can
+    recycle the browser.
+    """
+
+    def __init__(self, port, recycle_after=RECYCLE_AFTER, **kwargs):
+        self.port = port
+        self.recycle_after = recycle_after
+        self.served_before = pages_served(port)
+        self.pages = 0
+        super().__init__(**kwargs)
+
+    @property
+    def exhausted(self):
+        """Whether the browser has served the pages it may serve before a recycle"""
+        return self.served_before + self.pages >= self.recycle_after
+
+    def get(self, url):
+        self.pages += 1
+        _set_pages(self.port, self.served_before + self.pages)
+        return super().get(url)
+
+    def quit(self):
+        try:
+            # Ends the chromedriver session; a browser it attached to keeps running
+            super().quit()
+        finally:
+            release_lease(self.port)
+
+def attach_driver(options):
+    """Attach to a free, healthy browser of the running service; None if there is none.
+
+    options should be the ChromeOptions the scraper would launch with;
+    browser-level switches are ignored since the browser is already running,
+    but capabilities such as performance logging still apply. Browsers that
+    reached the service's --recycle-after are skipped until it restarts them.
+    """
+    state = _read_state()
+    recycle_after = state.get('recycle_after', RECYCLE_AFTER)
+    for browser in state.get('browsers', []):
+        port = browser['port']
+        if pages_served(port) >= recycle_after or not acquire_lease(port):
+            continue
+        if not healthy(port):
+            release_lease(port)
+            continue
+        options.debugger_address = f"127.0.0.1:{port}"
+        try:
+            return AttachedChrome(port, recycle_after, service=Service(pinned_driver_path()), options=options)
+        except Exception as e:
+            print(f"Could not attach to browser on port {port}: {str(e)}")
+            release_lease(port)
+    return None
+
+def find_chrome():
+    binary = os.getenv('CHROME_BINARY')
+    if binary:
+        return binary
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    raise FileNotFoundError("Chrome not found; set CHROME_BINARY")
+
+def launch_browser(port, lean=False):
+    """Start a headless Chrome listening for DevTools on port; returns (process, seconds to ready)"""
+    profile = os.path.abspath(_path(f"profile-{port}"))
+    arguments = CHROME_ARGUMENTS + (LEAN_ARGUMENTS if lean else []) + [
+        f'--remote-debugging-port={port}',
+        f'--user-data-dir={profile}',
+        'about:blank'
+    ]
+    start = time.monotonic()
+    process = subprocess.Popen([find_chrome()] + arguments,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while not healthy(port, timeout=0.5):
+        if process.poll() is not None or time.monotonic() - start > STARTUP_TIMEOUT:
+            process.kill()
+            raise RuntimeError(f"Chrome on port {port} didn't start")
+        time.sleep(0.1)
+    return process, time.monotonic() - start
+
+def _stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def serve(browsers=2, base_port=BASE_PORT, recycle_after=RECYCLE_AFTER, lean=False):
+    """Keep `browsers` warm Chrome processes running until interrupted.
+
+    Every HEALTH_INTERVAL seconds, dead or unresponsive browsers are
+    restarted and idle ones that served recycle_after pages are recycled to
+    shed leaked memory. Cold starts and recycles are printed and appended
+    to .browser-service/events.jsonl.
+    """
+    os.makedirs(SERVICE_DIR, exist_ok=True)
+    pinned_driver_path()  # Resolve the driver now so attaching never waits on the network
+    processes = {}
+
+    def start(port, reason):
+        process, seconds = launch_browser(port, lean)
+        processes[port] = process
+        _set_pages(port, 0)
+        _log_event('cold_start', port=port, seconds=round(seconds, 3), reason=reason)
+        print(f"Browser on port {port} ready in {seconds:.2f}s ({reason})")
+
+    def save_state():
+        _write_state({
+            'browsers': [{'port': port, 'pid': process.pid} for port, process in processes.items()],
+            'recycle_after': recycle_after,
+            'lean': lean,
+            'updated': datetime.utcnow().isoformat()
+        })
+
+    try:
+        for i in range(browsers):
+            start(base_port + i, 'startup')
+        save_state()
+        print(f"Serving {browsers} browsers; attach with: python scraper.py --attach")
+        signal.signal(signal.SIGTERM, _interrupt)
+        while True:
+            time.sleep(HEALTH_INTERVAL)
+            for port, process in list(processes.items()):
+                pages = pages_served(port)
+                if process.poll() is None and healthy(port) and pages < recycle_after:
+                    continue
+                if not acquire_lease(port):
+                    continue  # In use; check again once it's handed back
+                try:
+                    reason = 'recycle' if process.poll() is None and healthy(port) else 'unhealthy'
+                    _log_event(reason, port=port, pages=pages)
+                    print(f"Restarting browser on port {port}: {reason} after {pages} pages")
+                    _stop(process)
+                    start(port, reason)
+                finally:
+                    release_lease(port)
+            save_state()
+    except KeyboardInterrupt:
+        print("\nStopping browsers")
+    finally:
+        for process in processes.values():
+            _stop(process)
+        _write_state({'browsers': []})
+
+def print_status():
+    """Print each browser's health, pages served and lease holder, plus recent events"""
+    state = _read_state()
+    if not state.get('browsers'):
+        print("Browser service is not running")
+    for browser in state.get('browsers', []):
+        port = browser['port']
+        try:
+            with open(_path(f"{port}.lease")) as f:
+                holder = f.read()
+        except FileNotFoundError:
+            holder = None
+        print(f"port {port}: {'healthy' if healthy(port) else 'DOWN'}, {pages_served(port)} pages served, "
+              f"{'leased by pid ' + holder if holder else 'free'}")
+    try:
+        with open(_path(EVENTS_FILE)) as f:
+            events = f.readlines()[-10:]
+    except FileNotFoundError:
+        events = []
+    if events:
+        print("Recent events:")
+        for line in events:
+            event = json.loads(line)
+            print(f"  {event['time']} {event['event']} port {event['port']}"
+                  + (f" in {event['seconds']}s" if 'seconds' in event else '')
+                  + (f" after {event['pages']} pages" if 'pages' in event else ''))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep warm Chrome browsers for scraper runs to attach to")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="Start the browsers and keep them healthy")
+    serve_parser.add_argument("--browsers", type=int, default=2, help="Number of warm browsers (default 2)")
+    serve_parser.add_argument("--base-port", type=int, default=BASE_PORT, help="DevTools port of the first browser")
+    serve_parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER,
+                              help="Restart a browser after it has served this many pages")
+    serve_parser.add_argument("--lean", action='store_true', help="Start browsers with the lean-mode switches")
+    subparsers.add_parser('status', help="Show browser health, usage and recent events")
+    subparsers.add_parser('pin-driver', help="Resolve chromedriver again and cache its path")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.browsers, args.base_port, args.recycle_after, args.lean)
+    elif args.command == 'status':
+        print_status()
+    else:
+        print(f"Pinned chromedriver: {pinned_driver_path(refresh=True)}")
@@ -1,43 +1,179 @@
+import argparse
+import re
 import sqlite3
 from datetime import datetime
 
-def inspect_database():
-    """Quick database inspection tool"""
-    conn = sqlite3.connect('scratcher_data.db')
-    
+import db_handler
+from analysis_cache import EVICT_SQL, LATEST_KEYS_QUERY
+from analysis_engine import LATEST_SNAPSHOTS_FOR_NAMES_QUERY, LATEST_SNAPSHOTS_QUERY
+from db_handler import LATEST_FOR_NAMES_SQL
+from ev_engine import SNAPSHOTS_AFTER_QUERY, TIER_SUMS_QUERY
+from parquet_export import MONTH_QUERY
+from scrape_metrics import percentile
+
+SCRAPE_TIME_INDEX = 'CREATE INDEX idx_snapshots_scrape_time ON snapshots(scrape_time)'
+
+# (label, query, {table: index that would serve it}, tables whose full scan is by design)
+PLAN_CHECKS = [
+    ('analyze_scratchers: latest snapshots', LATEST_SNAPSHOTS_QUERY, {}, set()),
+    ('analyze_scratchers: latest snapshots of changed games', LATEST_SNAPSHOTS_FOR_NAMES_QUERY, {}, set()),
+    ('analyze_scratchers: latest scrape times', LATEST_KEYS_QUERY, {}, set()),
+    # One row per game, all of which are checked
+    ('analyze_scratchers: evict stale cache entries', EVICT_SQL, {}, {'analysis_cache'}),
+    ('ev_history: snapshots past the history watermark', SNAPSHOTS_AFTER_QUERY, {}, set()),
+    ('ev_history: tier sums past the history watermark', TIER_SUMS_QUERY, {}, set()),
+    ('generate_website_data: Parquet month export', MONTH_QUERY, {'snapshots': SCRAPE_TIME_INDEX}, set()),
+    ('ScraperDataWriter: latest snapshot per game', LATEST_FOR_NAMES_SQL, {}, set()),
+]
+
+TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b|ORDER\b)(\w+))?',
+                         re.IGNORECASE)
+
+def open_read_only(db_path=None):
+    """Connect without the ability to create or change the database"""
+    return sqlite3.connect(f"file:{db_path or db_handler.DB_PATH}?mode=ro", uri=True)
+
+def _tables(conn):
+    return [name for name, in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+
+def report_overview(conn):
+    """File size, free pages and journal mode"""
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    print(f"Size: {page_count * page_size / 2**20:.1f} MB ({page_count} pages of {page_size} bytes), "
+          f"journal mode {journal_mode}")
+    fragmentation = freelist / page_count if page_count else 0.0
+    print(f"Free pages: {freelist} ({fragmentation:.1%} of the file)"
+          + (" - run VACUUM (or python compaction.py) to reclaim them" if fragmentation > 0.1 else ""))
+
+def report_row_counts(conn):
+    """Rows per table"""
+    print("\nRows per table:")
+    for table in _tables(conn):
+        print(f"  {table}: {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:,}")
+
+def report_games(conn, top=10):
+    """Snapshot counts, time span and snapshots per day for each game"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(snapshots)')}
+    last_seen = 'MAX(COALESCE(last_seen, scrape_time))' if 'last_seen' in columns else 'MAX(scrape_time)'
+    games = conn.execute(f'''
+        SELECT name, COUNT(*), MIN(scrape_time), MAX(scrape_time), {last_seen}
+        FROM snapshots
+        GROUP BY name
+    ''').fetchall()
+    if not games:
+        print("\nNo snapshots yet")
+        return
+    snapshots = conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+    tiers = conn.execute('SELECT COUNT(*) FROM prize_tiers').fetchone()[0]
+
+    rates = []
+    for name, count, first, last, seen in games:
+        days = (datetime.fromisoformat(seen) - datetime.fromisoformat(first)).total_seconds() / 86400
+        rates.append(count / days if days > 0 else None)
+    latest = max(seen for *_, seen in games)
+    stale = [name for name, *_, seen in games
+             if (datetime.fromisoformat(latest) - datetime.fromisoformat(seen)).days > 7]
+    known_rates = [rate for rate in rates if rate is not None]
+    counts = [count for _, count, *_ in games]
+
+    print(f"\nGames: {len(games)}, {snapshots:,} snapshots, {tiers / snapshots:.1f} prize tiers per snapshot")
+    print(f"Latest scrape: {latest}")
+    print(f"Snapshots per game: min {min(counts)}, median {percentile(counts, 50):.0f}, max {max(counts)}")
+    if known_rates:
+        print(f"Snapshots per day: p10 {percentile(known_rates, 10):.2f}, median {percentile(known_rates, 50):.2f}, "
+              f"p90 {percentile(known_rates, 90):.2f}")
+    if stale:
+        print(f"{len(stale)} games not seen in the week before the latest scrape (ended?): "
+              + ", ".join(sorted(stale)[:top]) + (" ..." if len(stale) > top else ""))
+
+    print(f"\nMost snapshots (top {top}):")
+    for (name, count, first, last, seen), rate in sorted(zip(games, rates), key=lambda item: -item[0][1])[:top]:
+        print(f"  {name}: {count} snapshots from {first[:10]} to {last[:10]}"
+              + (f", {rate:.2f}/day" if rate is not None else ""))
+
+def report_sizes(conn):
+    """Bytes and unused space per table and index from the dbstat virtual table"""
+    owners = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"))
+    try:
+        rows = conn.execute('''
+            SELECT name, SUM(pgsize), SUM(unused), COUNT(*)
+            FROM dbstat
+            GROUP BY name
+            ORDER BY SUM(pgsize) DESC
+        ''').fetchall()
+    except sqlite3.OperationalError:
+        print("\nTable and index sizes: dbstat isn't available in this SQLite build")
+        return
+    print("\nTable and index sizes:")
+    for name, size, unused, pages in rows:
+        kind = 'table' if owners.get(name, name) == name else f"index on {owners[name]}"
+        print(f"  {name} ({kind}): {size / 2**20:.2f} MB in {pages} pages, {unused / size:.0%} unused")
+
+def scan_warnings(conn, sql, plan):
+    """Full scans of real tables in an EXPLAIN QUERY PLAN result, as [(table, plan detail)]"""
+    tables = set(_tables(conn))
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    warnings = []
+    for *_, detail in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if not match or 'COVERING INDEX' in detail or 'VIRTUAL TABLE' in detail:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table in tables:
+            warnings.append((table, detail))
+    return warnings
+
+def report_query_plans(conn):
+    """EXPLAIN QUERY PLAN for the analysis and publishing queries, flagging full table scans"""
+    print("\nQuery plans:")
+    suggestions = set()
+    for label, sql, indexes, expected in PLAN_CHECKS:
+        try:
+            plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, (None,) * sql.count('?')).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"  {label}: skipped ({str(e)})")
+            continue
+        warnings = [(table, detail) for table, detail in scan_warnings(conn, sql, plan) if table not in expected]
+        print(f"  {label}: {'FULL SCAN' if warnings else 'ok'}")
+        for *_, detail in plan:
+            print(f"      {detail}")
+        for table, detail in warnings:
+            if table in indexes:
+                suggestions.add(indexes[table])
+            else:
+                suggestions.add(f"-- index the columns {table} is filtered or joined on in: {label}")
+    if suggestions:
+        print("\nSuggested indexes:")
+        for suggestion in sorted(suggestions):
+            print(f"  {suggestion}" + ('' if suggestion.startswith('--') else ';'))
+
+def inspect_database(db_path=None, top=10, sizes=True):
+    """Print a health and query-plan report for the database.
+
+    Uses aggregate queries and PRAGMAs only, so it stays quick on large
+    databases; the dbstat size breakdown reads every page and can be
+    skipped with sizes=False.
+    """
     try:
-        # Get latest scrape time
-        cursor = conn.execute('''
-            SELECT MAX(scrape_time) as last_scrape,
-                   COUNT(*) as total_records
-            FROM scraper_data
-        ''')
-        last_scrape, record_count = cursor.fetchone()
-        print(f"Last Scrape: {last_scrape or 'Never'}")
-        print(f"Total Records: {record_count}\n")
-
-        # Show table structure
-        print("Table Structure:")
-        cursor = conn.execute("PRAGMA table_info(scraper_data)")
-        for column in cursor.fetchall():
-            print(f"- {column[1]} ({column[2]})")
-        
-        # Show sample data
-        if record_count > 0:
-            print("\nRecent Entries (max 5):")
-            cursor = conn.execute('''
-                SELECT name, cost, odds, prize_amount, scrape_time 
-                FROM scraper_data 
-                ORDER BY scrape_time DESC 
-                LIMIT 5
-            ''')
-            for row in cursor:
-                print(f"\nGame: {row[0]}")
-                print(f"Cost: ${row[1]:.2f}")
-                print(f"Odds: 1 in {row[2]:.2f}")
-                print(f"Prize: ${row[3]:,.2f}")
-                print(f"Scraped: {row[4]}")
-                
+        conn = open_read_only(db_path)
+    except sqlite3.OperationalError as e:
+        print(f"Database error: {str(e)}")
+        return
+    try:
+        report_overview(conn)
+        report_row_counts(conn)
+        report_games(conn, top)
+        if sizes:
+            report_sizes(conn)
+        report_query_plans(conn)
     except sqlite3.OperationalError as e:
         print(f"Database error: {str(e)}")
         print("Maybe the tables haven't been created yet?")
@@ -45,5 +181,12 @@ def inspect_database():
         conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report database health, sizes and query plans")
+    parser.add_argument("--db", help=f"SQLite database to inspect (default {db_handler.DB_PATH})")
+    parser.add_argument("--top", type=int, default=10, help="Games to list by snapshot count (default 10)")
+    parser.add_argument("--no-sizes", action='store_true',
+                        help="Skip the per-table size breakdown, which reads every page")
+    args = parser.parse_args()
+
     print("Scratcher Database Inspector\n" + "="*30)
-    inspect_database()
+    inspect_database(args.db, args.top, sizes=not args.no_sizes)
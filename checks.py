@@ -0,0 +1,205 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import closing, contextmanager, nullcontext, redirect_stdout
+
+import db_handler
+from db_handler import init_db, store_scraper_data
+
+CHECKS = []
+
+def check(fn):
+    """Register fn as a check; it fails by raising, usually an AssertionError"""
+    CHECKS.append(fn)
+    return fn
+
+@contextmanager
+def scratch_database():
+    """Run in a scratch directory holding its own database, as benchmark.py does"""
+    workdir = tempfile.mkdtemp(prefix='scratcha-check-')
+    cwd, db_path = os.getcwd(), db_handler.DB_PATH
+    try:
+        os.chdir(workdir)
+        db_handler.DB_PATH = os.path.join(workdir, 'scratcher_data.db')
+        init_db()
+        yield workdir
+    finally:
+        os.chdir(cwd)
+        db_handler.DB_PATH = db_path
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def snapshot(name, scrape_time, remaining, cost=5.0, odds=4.0):
+    """A scraper result with three prize tiers, in scrape_game_details' format"""
+    return {
+        'name': name,
+        'cost': cost,
+        'odds': odds,
+        'image_url': None,
+        'prize_amounts': [1000.0, 50.0, 5.0],
+        'total_prizes': [10, 1000, 100000],
+        'remaining_prizes': remaining,
+        'scrape_time': scrape_time
+    }
+
+@check
+def check_parquet_mixed_precision():
+    """A month holding scrape times with and without fractional seconds exports"""
+    from parquet_export import export_history, load_history
+    with scratch_database():
+        store_scraper_data(snapshot('Mixed', '2024-03-01T12:00:00', [10, 900, 90000]))
+        store_scraper_data(snapshot('Mixed', '2024-03-02T12:00:00.250000', [9, 850, 85000]))
+        assert export_history('history') == 1
+        frame = load_history('history')
+        times = sorted(set(frame['scrape_time']))
+        assert [t.isoformat() for t in times] == ['2024-03-01T12:00:00', '2024-03-02T12:00:00.250000'], times
+
+@check
+def check_history_rerun():
+    """Rerunning the history after a crash before the watermark moved adds no duplicate points"""
+    from history_materializer import HISTORY_DIR, materialize_history
+    with scratch_database():
+        for day, remaining in enumerate(([10, 900, 90000], [9, 850, 85000], [8, 800, 80000]), start=1):
+            store_scraper_data(snapshot('Rerun', f"2024-03-0{day}T12:00:00", remaining))
+        assert materialize_history() == 3
+        path = os.path.join(HISTORY_DIR, 'rerun.jsonl')
+        with open(path) as f:
+            expected = f.read()
+
+        # Crash with the watermark not yet moved and the last line half written
+        with closing(db_handler.connect()) as conn, conn:
+            conn.execute('UPDATE history_watermark SET snapshot_id = 1')
+        with open(path, 'w') as f:
+            f.write(expected[:-20])
+        materialize_history()
+        with open(path) as f:
+            assert f.read() == expected
+
+        store_scraper_data(snapshot('Rerun', '2024-03-04T12:00:00', [7, 750, 75000]))
+        assert materialize_history() == 1
+        with open(path) as f:
+            dates = [json.loads(line)['date'] for line in f]
+        assert dates == [f"2024-03-0{day}T12:00:00" for day in range(1, 5)], dates
+
+@check
+def check_crawl_interrupted_run():
+    """URLs an interrupted run never dispatched keep their attempts"""
+    from crawl_queue import CrawlQueue
+    from worker_pool import run_worker_pool
+
+    class Driver:
+        def quit(self):
+            pass
+
+    def interrupt(result):
+        raise KeyboardInterrupt
+
+    urls = [f"https://example.com/game/{i}" for i in range(5)]
+    with scratch_database():
+        crawl = CrawlQueue()
+        crawl.reset(urls)
+        try:
+            run_worker_pool(crawl.ready(), Driver, lambda driver, wait, url: {'url': url}, interrupt,
+                            workers=1, rate=0, claim_fn=lambda url: crawl.claim([url]))
+        except KeyboardInterrupt:
+            pass
+        with closing(db_handler.connect()) as conn:
+            attempts = dict(conn.execute('SELECT url, attempts FROM crawl_queue'))
+        assert attempts == dict({url: 0 for url in urls}, **{urls[0]: 1}), attempts
+        assert crawl.ready() == urls[1:]
+
+@check
+def check_http_parser():
+    """parse_game_page reads the fixture page, and returns None for an SPA shell without data"""
+    from http_scraper import parse_game_page
+    fixture = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'game_page.html')
+    with open(fixture, encoding='utf-8') as f:
+        html = f.read()
+    expected = {
+        'name': 'Lucky 7s',
+        'cost': 5.0,
+        'odds': 3.85,
+        'prize_amounts': [1000000.0, 10000.0, 100.0, 5.0],
+        'total_prizes': [4, 120, 24000, 1560000],
+        'remaining_prizes': [3, 87, 17512, 1134220],
+        'scrape_time': '2024-03-01T12:00:00',
+        'image_url': 'https://example.com/images/lucky-7s.png'
+    }
+    result = parse_game_page(html, scrape_time='2024-03-01T12:00:00')
+    assert result == expected, result
+
+    shell = '<html><body><div id="root"></div><script src="/static/js/main.js"></script></body></html>'
+    assert parse_game_page(shell) is None
+    # Header rendered but the prize table still loading
+    assert parse_game_page(html[:html.index('<table')] + '</div></body></html>') is None
+
+@check
+def check_ev_history():
+    """ev_history matches calculate_ev_new and calculate_game_totals on each game's latest snapshot"""
+    from analysis_engine import calculate_ev_new, calculate_game_totals, load_latest_snapshots
+    from ev_engine import ev_history
+    with scratch_database():
+        store_scraper_data(snapshot('Open', '2024-03-01T12:00:00', [10, 900, 90000]))
+        store_scraper_data(snapshot('Open', '2024-03-02T12:00:00', [9, 850, 85000], odds=3.5))
+        store_scraper_data(snapshot('Sold Out', '2024-03-01T12:00:00', [0, 0, 0], cost=2.0))
+        with closing(db_handler.connect()) as conn:
+            history = ev_history(conn)
+            latest = load_latest_snapshots(conn)
+        assert len(history) == 3 and list(history['snapshot_id']) == sorted(history['snapshot_id'])
+        for game, tiers in latest:
+            row = history[history['snapshot_id'] == game['id']].iloc[0]
+            totals = calculate_game_totals(tiers, game['odds'])
+            for key in ('total_tickets', 'remaining_tickets', 'remaining_winning', 'percent_remaining'):
+                assert abs(row[key] - totals[key]) < 1e-9, (game['name'], key, row[key], totals[key])
+            expected = calculate_ev_new(game['cost'], game['odds'], tiers)
+            assert abs(row['net_ev'] - expected) < 1e-9, (game['name'], row['net_ev'], expected)
+
+@check
+def check_analysis_cache_eviction():
+    """Cache entries of ended games and of older engine versions are evicted"""
+    from analysis_cache import ENGINE_VERSION, RETIRED_AFTER_DAYS
+    from analysis_engine import analyze_scratchers
+    with scratch_database():
+        store_scraper_data(snapshot('Ended', '2024-03-01T12:00:00', [10, 900, 90000]))
+        store_scraper_data(snapshot('Running', '2024-03-01T12:00:00', [10, 900, 90000]))
+        assert [game['name'] for game in analyze_scratchers()] == ['Ended', 'Running']
+
+        later = f"2024-03-{2 + RETIRED_AFTER_DAYS}T12:00:00"
+        store_scraper_data(snapshot('Running', later, [9, 850, 85000]))
+        with closing(db_handler.connect()) as conn, conn:
+            conn.execute('INSERT INTO analysis_cache (name, scrape_time, engine_version, analysis) '
+                         'VALUES (?, ?, ?, ?)', ('Running', later, ENGINE_VERSION - 1, '{}'))
+        assert [game['name'] for game in analyze_scratchers()] == ['Running']
+        with closing(db_handler.connect()) as conn:
+            entries = conn.execute('SELECT name, scrape_time, engine_version FROM analysis_cache').fetchall()
+        assert entries == [('Running', later, ENGINE_VERSION)], entries
+
+def run_checks(names=None, verbose=False):
+    """Run the registered checks (or those named); returns the number that failed"""
+    failed = 0
+    for fn in CHECKS:
+        name = fn.__name__[len('check_'):]
+        if names and name not in names:
+            continue
+        try:
+            with nullcontext() if verbose else redirect_stdout(io.StringIO()):
+                fn()
+            print(f"ok    {name}")
+        except Exception as e:
+            failed += 1
+            print(f"FAIL  {name}: {type(e).__name__}: {str(e)}")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the pipeline's behaviour on small scratch databases")
+    parser.add_argument("names", nargs='*', help="Checks to run, without the check_ prefix (default all)")
+    parser.add_argument("--verbose", action='store_true', help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    failed = run_checks(args.names, args.verbose)
+    print(f"\n{failed} of {len(args.names) if args.names else len(CHECKS)} checks failed" if failed
+          else "\nAll checks passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,99 @@
+import argparse
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import db_handler
+from db_handler import connect, init_db
+
+DAILY_DAYS = 90   # Keep one snapshot per day this far back, one per week before that
+
+SNAPSHOT_TIERS_QUERY = '''
+    SELECT s.id, s.name, s.scrape_time, s.cost, s.odds, t.amount, t.total
+    FROM snapshots s
+    LEFT JOIN prize_tiers t ON t.snapshot_id = s.id
+    ORDER BY s.name, s.scrape_time, t.tier
+'''
+
+def database_bytes(conn):
+    """Size of the database file in bytes, from its page count"""
+    return conn.execute('PRAGMA page_count').fetchone()[0] * conn.execute('PRAGMA page_size').fetchone()[0]
+
+def bucket(scrape_time, cutoff):
+    """The day (after cutoff) or ISO week (before it) a snapshot is downsampled into"""
+    if scrape_time >= cutoff:
+        return ('day', scrape_time.date())
+    return ('week',) + tuple(scrape_time.isocalendar()[:2])
+
+def snapshots_to_drop(rows, cutoff):
+    """Ids of snapshots compaction removes, from SNAPSHOT_TIERS_QUERY rows.
+
+    Per game, the first and last snapshots and every snapshot whose cost,
+    odds or prize structure (tier amounts and totals) differs from the one
+    before are kept. Of the rest, the latest snapshot of each day after
+    cutoff and of each week before it is kept.
+    """
+    drop = []
+    for _, game_rows in groupby(rows, key=lambda row: row[1]):
+        snapshots = []
+        for (snapshot_id, _, scrape_time, cost, odds), tiers in groupby(game_rows, key=lambda row: row[:5]):
+            structure = (cost, odds, tuple(row[5:] for row in tiers))
+            snapshots.append((snapshot_id, datetime.fromisoformat(scrape_time), structure))
+
+        keep = {snapshots[0][0], snapshots[-1][0]}
+        latest_in_bucket = {}
+        previous = None
+        for snapshot_id, scrape_time, structure in snapshots:
+            if structure != previous:
+                keep.add(snapshot_id)
+            previous = structure
+            latest_in_bucket[bucket(scrape_time, cutoff)] = snapshot_id
+        keep.update(latest_in_bucket.values())
+        drop.extend(snapshot_id for snapshot_id, _, _ in snapshots if snapshot_id not in keep)
+    return drop
+
+def compact_history(daily_days=DAILY_DAYS, now=None, dry_run=False):
+    """Downsample old snapshots, then VACUUM and ANALYZE the database.
+
+    See snapshots_to_drop for what is kept. Returns the number of snapshots
+    removed.
+    """
+    init_db()
+    cutoff = (now or datetime.utcnow()) - timedelta(days=daily_days)
+    with closing(connect()) as conn:
+        total = conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+        drop = snapshots_to_drop(conn.execute(SNAPSHOT_TIERS_QUERY), cutoff)
+        print(f"{len(drop)} of {total} snapshots to remove "
+              f"(daily for {daily_days} days, weekly before {cutoff.date()})")
+        if dry_run or not drop:
+            return len(drop)
+
+        before = database_bytes(conn)
+        with conn:
+            conn.execute('CREATE TEMP TABLE dropped (id INTEGER PRIMARY KEY)')
+            conn.executemany('INSERT INTO dropped (id) VALUES (?)', ((snapshot_id,) for snapshot_id in drop))
+            tiers = conn.execute('DELETE FROM prize_tiers WHERE snapshot_id IN (SELECT id FROM dropped)').rowcount
+            conn.execute('DELETE FROM snapshots WHERE id IN (SELECT id FROM dropped)')
+            conn.execute('DROP TABLE dropped')
+        print(f"Removed {len(drop)} snapshots and {tiers} prize tier rows")
+
+        print("Running VACUUM and ANALYZE...")
+        conn.execute('VACUUM')
+        conn.execute('ANALYZE')
+        after = database_bytes(conn)
+        print(f"Database size {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB "
+              f"({(before - after) / 2**20:.1f} MB reclaimed)")
+    print("Run python analysis_engine.py --rebuild-history to drop the removed snapshots from the history files")
+    return len(drop)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downsample old snapshot history and reclaim space")
+    parser.add_argument("--daily-days", type=int, default=DAILY_DAYS,
+                        help=f"Keep daily snapshots this many days back, weekly before that (default {DAILY_DAYS})")
+    parser.add_argument("--db", help=f"SQLite database to compact (default {db_handler.DB_PATH})")
+    parser.add_argument("--dry-run", action='store_true', help="Only report how many snapshots would be removed")
+    args = parser.parse_args()
+
+    if args.db:
+        db_handler.DB_PATH = args.db
+    compact_history(args.daily_days, dry_run=args.dry_run)
@@ -0,0 +1,144 @@
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from db_handler import connect
+
+DISCOVERY_TTL = timedelta(hours=6)   # Reuse a discovered URL set for this long
+MAX_ATTEMPTS = 3                     # Tries per URL before it's given up for the run
+RETRY_BASE = timedelta(seconds=30)   # Backoff after the first failure, doubling each time
+RETRY_CAP = timedelta(minutes=15)
+
+def init_queue_table(conn):
+    """Create the table tracking each URL of the current crawl"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS crawl_queue (
+        url TEXT PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at DATETIME,
+        discovered_at DATETIME NOT NULL,
+        updated_at DATETIME
+    )''')
+
+def backoff(attempts):
+    """Delay before retrying a URL that has been tried `attempts` times"""
+    return min(RETRY_BASE * 2 ** max(attempts - 1, 0), RETRY_CAP)
+
+class CrawlQueue:
+    """Persistent per-URL crawl state, so an interrupted run resumes where it stopped.
+
+    A URL is 'pending' until claimed, 'running' while being scraped, then
+    'done' or 'failed'. URLs are claimed one by one as they are dispatched,
+    so those a run never reached keep their attempts. Claiming schedules the
+    next attempt up front, so a URL whose run crashed mid-scrape is retried
+    after its backoff like any other failure, until MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+
+    def _connect(self):
+        conn = connect(self.db_path)
+        init_queue_table(conn)
+        return closing(conn)
+
+    def cached_urls(self, ttl=DISCOVERY_TTL, now=None):
+        """The current crawl's URLs if they were discovered within ttl, else None"""
+        now = now or datetime.utcnow()
+        with self._connect() as conn:
+            discovered_at = conn.execute('SELECT MAX(discovered_at) FROM crawl_queue').fetchone()[0]
+            if discovered_at is None or datetime.fromisoformat(discovered_at) < now - ttl:
+                return None
+            return [url for url, in conn.execute('SELECT url FROM crawl_queue ORDER BY url')]
+
+    def reset(self, urls, now=None):
+        """Start a new crawl of urls, dropping all state from the previous one"""
+        now = (now or datetime.utcnow()).isoformat()
+        with self._connect() as conn:
+            with conn:
+                conn.execute('DELETE FROM crawl_queue')
+                conn.executemany(
+                    'INSERT INTO crawl_queue (url, discovered_at, updated_at) VALUES (?, ?, ?)',
+                    [(url, now, now) for url in urls]
+                )
+
+    def restart(self, now=None):
+        """Start a new crawl of the same URLs, keeping their discovery time"""
+        now = (now or datetime.utcnow()).isoformat()
+        with self._connect() as conn:
+            with conn:
+                conn.execute('''UPDATE crawl_queue
+                    SET status = 'pending', attempts = 0, last_error = NULL,
+                        next_attempt_at = NULL, updated_at = ?''', (now,))
+
+    def ready(self, now=None):
+        """URLs to scrape now: pending ones plus unfinished ones whose backoff has passed"""
+        now = (now or datetime.utcnow()).isoformat()
+        with self._connect() as conn:
+            return [url for url, in conn.execute('''
+                SELECT url FROM crawl_queue
+                WHERE status = 'pending'
+                   OR (status IN ('running', 'failed') AND attempts < ? AND next_attempt_at <= ?)
+                ORDER BY url''', (MAX_ATTEMPTS, now))]
+
+    def unfinished(self):
+        """Number of URLs still to scrape or retry in the current crawl"""
+        with self._connect() as conn:
+            return conn.execute('''
+                SELECT COUNT(*) FROM crawl_queue
+                WHERE status != 'done' AND attempts < ?''', (MAX_ATTEMPTS,)).fetchone()[0]
+
+    def next_retry_delay(self, now=None):
+        """Seconds until the next retry is due, or None if nothing is left to retry"""
+        now = now or datetime.utcnow()
+        with self._connect() as conn:
+            next_at = conn.execute('''
+                SELECT MIN(next_attempt_at) FROM crawl_queue
+                WHERE status IN ('running', 'failed') AND attempts < ?''', (MAX_ATTEMPTS,)).fetchone()[0]
+        if next_at is None:
+            return None
+        return max((datetime.fromisoformat(next_at) - now).total_seconds(), 0.0)
+
+    def claim(self, urls, now=None):
+        """Count an attempt for each URL and schedule its retry in case it doesn't finish"""
+        now = now or datetime.utcnow()
+        with self._connect() as conn:
+            with conn:
+                for url in urls:
+                    row = conn.execute('SELECT attempts FROM crawl_queue WHERE url = ?', (url,)).fetchone()
+                    attempts = (row[0] if row else 0) + 1
+                    conn.execute('''UPDATE crawl_queue
+                        SET status = 'running', attempts = ?, next_attempt_at = ?, updated_at = ?
+                        WHERE url = ?''', (attempts, (now + backoff(attempts)).isoformat(), now.isoformat(), url))
+
+    def mark_done(self, urls):
+        """Record URLs whose results are committed to the database"""
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            with conn:
+                conn.executemany('''UPDATE crawl_queue
+                    SET status = 'done', last_error = NULL, updated_at = ?
+                    WHERE url = ?''', [(now, url) for url in urls])
+
+    def mark_failed(self, url, error):
+        """Record a failed attempt; the URL is retried once its backoff has passed"""
+        with self._connect() as conn:
+            with conn:
+                conn.execute('''UPDATE crawl_queue
+                    SET status = 'failed', last_error = ?, updated_at = ?
+                    WHERE url = ?''', (str(error)[:500], datetime.utcnow().isoformat(), url))
+
+    def summary(self):
+        """{status: count} for the current crawl"""
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM crawl_queue GROUP BY status'))
+
+    def report(self):
+        """Print the crawl's status counts and the URLs given up on"""
+        counts = self.summary()
+        print("\nCrawl queue: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+        with self._connect() as conn:
+            for url, attempts, error in conn.execute('''
+                SELECT url, attempts, last_error FROM crawl_queue
+                WHERE status != 'done' AND attempts >= ?''', (MAX_ATTEMPTS,)):
+                print(f"- gave up on {url} after {attempts} attempts: {error}")
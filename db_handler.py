@@ -1,10 +1,18 @@
+import json
 import sqlite3
 from contextlib import closing
 from datetime import datetime
+from itertools import groupby
 
-def init_db():
+DB_PATH = 'scratcher_data.db'
+
+def connect(db_path=None):
+    """Open a connection to the scratcher database"""
+    return sqlite3.connect(db_path or DB_PATH)
+
+def init_db(db_path=None):
     """Initialize database and create tables with new schema"""
-    with closing(sqlite3.connect('scratcher_data.db')) as conn:
+    with closing(connect(db_path)) as conn:
         # Create analyzed results table (unchanged)
         conn.execute('''CREATE TABLE IF NOT EXISTS scratchers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -17,101 +25,318 @@ def init_db():
             value_retention REAL,
             UNIQUE(name, timestamp)
         )''')
-        
-        # Create new scraper raw data table with 20 prize tiers and image_url
-        prize_columns = ',\n'.join(
-            f'''prize{i}_amount REAL,
-               prize{i}_total INTEGER,
-               prize{i}_remaining INTEGER'''
-            for i in range(1, 21)
-        )
-        
-        create_table_sql = f'''CREATE TABLE IF NOT EXISTS scraper_data (
+
+        # One row per scraped game page...
+        conn.execute('''CREATE TABLE IF NOT EXISTS snapshots (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             cost REAL NOT NULL,
             odds REAL NOT NULL,
             image_url TEXT,
-            {prize_columns},
             scrape_time DATETIME NOT NULL,
-            UNIQUE(name, scrape_time)
-        )'''
-        
-        conn.execute(create_table_sql)
+            last_seen DATETIME
+        )''')
+        # last_seen: latest scrape that found the game unchanged since scrape_time
+        if 'last_seen' not in _columns(conn, 'snapshots'):
+            conn.execute('ALTER TABLE snapshots ADD COLUMN last_seen DATETIME')
+        conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_snapshots_name_time
+            ON snapshots(name, scrape_time)''')
+        # Time-range reads across all games (Parquet export, latest scrape time)
+        conn.execute('''CREATE INDEX IF NOT EXISTS idx_snapshots_scrape_time
+            ON snapshots(scrape_time)''')
+
+        # ...and one row per prize tier on that page, tier 1 being the largest prize.
+        # The primary key doubles as the snapshot_id index.
+        conn.execute('''CREATE TABLE IF NOT EXISTS prize_tiers (
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+            tier INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            total INTEGER NOT NULL,
+            remaining INTEGER NOT NULL,
+            PRIMARY KEY (snapshot_id, tier)
+        ) WITHOUT ROWID''')
         conn.commit()
 
+        if _table_exists(conn, 'scraper_data'):
+            migrate_scraper_data(conn)
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+def migrate_scraper_data(conn):
+    """Move rows from the old 60-column scraper_data table into snapshots/prize_tiers.
+
+    Runs in a single transaction, so readers see either the old or the new
+    layout, then drops the old table and vacuums to reclaim its space.
+    """
+    count = conn.execute('SELECT COUNT(*) FROM scraper_data').fetchone()[0]
+    print(f"Migrating {count} scraper_data rows to snapshots/prize_tiers...")
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Insert in time order so snapshot ids grow with scrape_time
+        conn.execute('''INSERT OR IGNORE INTO snapshots (name, cost, odds, image_url, scrape_time)
+            SELECT name, cost, odds, image_url, scrape_time
+            FROM scraper_data
+            ORDER BY scrape_time, id''')
+        for i in range(1, 21):
+            conn.execute(f'''INSERT OR IGNORE INTO prize_tiers (snapshot_id, tier, amount, total, remaining)
+                SELECT s.id, {i}, d.prize{i}_amount, d.prize{i}_total, d.prize{i}_remaining
+                FROM scraper_data d
+                JOIN snapshots s ON s.name = d.name AND s.scrape_time = d.scrape_time
+                WHERE d.prize{i}_amount IS NOT NULL
+                  AND d.prize{i}_total IS NOT NULL
+                  AND d.prize{i}_remaining IS NOT NULL''')
+        conn.execute('DROP TABLE scraper_data')
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.isolation_level = isolation_level
+    conn.execute('VACUUM')
+    print("Migration complete")
+
+UPSERT_SNAPSHOT_SQL = '''INSERT INTO snapshots (name, cost, odds, image_url, scrape_time)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(name, scrape_time) DO UPDATE SET
+        cost = excluded.cost, odds = excluded.odds, image_url = excluded.image_url'''
+
+SNAPSHOT_ID_SQL = 'SELECT id FROM snapshots WHERE name = ? AND scrape_time = ?'
+
+DELETE_TIERS_SQL = 'DELETE FROM prize_tiers WHERE snapshot_id = ?'
+
+INSERT_TIER_SQL = '''INSERT INTO prize_tiers (snapshot_id, tier, amount, total, remaining)
+    VALUES (?, ?, ?, ?, ?)'''
+
+# Each named game's latest snapshot with its tiers, for change detection
+LATEST_FOR_NAMES_SQL = '''SELECT s.name, s.cost, s.odds, s.image_url, s.scrape_time,
+           t.tier, t.amount, t.total, t.remaining
+    FROM snapshots s
+    LEFT JOIN prize_tiers t ON t.snapshot_id = s.id
+    WHERE s.id IN (
+        SELECT (SELECT id FROM snapshots WHERE name = names.value ORDER BY scrape_time DESC LIMIT 1)
+        FROM json_each(?) names
+    )
+    ORDER BY s.id, t.tier'''
+
+TOUCH_SNAPSHOT_SQL = '''UPDATE snapshots SET last_seen = MAX(COALESCE(last_seen, scrape_time), ?)
+    WHERE name = ? AND scrape_time = ?'''
+
+INSERT_ANALYSIS_SQL = '''INSERT INTO scratchers
+    (name, timestamp, remaining_prizes, current_odds,
+     prize_pool, ticket_cost, value_retention)
+    VALUES (?, ?, ?, ?, ?, ?, ?)'''
+
+def configure_connection(conn):
+    """Apply the pragmas used for bulk writes: WAL journal, relaxed sync, larger cache"""
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA cache_size=-20000')  # ~20 MB
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def scraper_row(data):
+    """Build the snapshot values and (tier, amount, total, remaining) rows for one scrape result.
+
+    Tiers are numbered from 1 in order of prize amount, largest first.
+    """
+    prize_tiers = sorted(zip(
+        data['prize_amounts'],
+        data['total_prizes'],
+        data['remaining_prizes']
+    ), reverse=True)
+    snapshot = (data['name'], data['cost'], data['odds'], data['image_url'], data['scrape_time'])
+    tiers = [
+        (tier, amount, total, remaining)
+        for tier, (amount, total, remaining) in enumerate(prize_tiers, 1)
+    ]
+    return snapshot, tiers
+
+def snapshot_content(snapshot, tiers):
+    """What a snapshot says about its game, minus when it was taken, for change detection"""
+    _, cost, odds, image_url, _ = snapshot
+    return (float(cost), float(odds), image_url,
+            tuple((tier, float(amount), int(total), int(remaining)) for tier, amount, total, remaining in tiers))
+
+class ScraperDataWriter:
+    """Writes a whole scrape run over one connection, in batched transactions.
+
+    Use as a context manager; rows are buffered by add() and written with
+    executemany every batch_size rows and on exit. Rows that can't be built
+    or inserted are collected in `failed` as (name, error) pairs instead of
+    aborting the batch. on_written, if given, is called with the list of
+    scrape results each flush committed.
+
+    A result identical to its game's latest snapshot isn't stored again;
+    that snapshot's last_seen is moved up to the new scrape_time instead,
+    and the result is counted in `unchanged` as well as `written`.
+    """
+
+    def __init__(self, db_path=None, batch_size=500, on_written=None):
+        self.db_path = db_path or DB_PATH
+        self.batch_size = batch_size
+        self.on_written = on_written
+        self.conn = None
+        self.pending = []
+        self.written = []
+        self.unchanged = []
+        self.failed = []
+
+    def __enter__(self):
+        self.conn = configure_connection(sqlite3.connect(self.db_path))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+            self.conn = None
+        return False
+
+    def add(self, data):
+        """Queue one scrape result for writing"""
+        try:
+            snapshot, tiers = scraper_row(data)
+            # Built here, so a row that can't be compared is reported rather than failing the batch
+            self.pending.append((data, (snapshot, tiers, snapshot_content(snapshot, tiers))))
+        except Exception as e:
+            self.failed.append((data.get('name'), f"Invalid data: {e}"))
+            return
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        """Queue and write a list of scrape results"""
+        for data in records:
+            self.add(data)
+        self.flush()
+
+    def _latest(self, names):
+        """{name: (scrape_time, content)} of the stored latest snapshot of each game"""
+        rows = self.conn.execute(LATEST_FOR_NAMES_SQL, (json.dumps(sorted(set(names))),))
+        latest = {}
+        for (name, cost, odds, image_url, scrape_time), group in groupby(rows, key=lambda row: row[:5]):
+            tiers = [row[5:] for row in group if row[5] is not None]
+            latest[name] = (scrape_time, snapshot_content((name, cost, odds, image_url, scrape_time), tiers))
+        return latest
+
+    def _write(self, batch):
+        """Upsert the batch's changed snapshots and replace their prize tiers.
+
+        Returns the scrape results that matched their game's latest snapshot,
+        whose last_seen was touched instead.
+        """
+        latest = self._latest(snapshot[0] for _, (snapshot, _, _) in batch)
+        changed = []
+        touches = []
+        unchanged = []
+        for data, (snapshot, tiers, content) in batch:
+            name, scrape_time = snapshot[0], snapshot[4]
+            previous = latest.get(name)
+            if previous is not None and previous[0] < scrape_time and previous[1] == content:
+                touches.append((scrape_time, name, previous[0]))
+                unchanged.append(data)
+                continue
+            changed.append((snapshot, tiers))
+            if previous is None or previous[0] <= scrape_time:
+                latest[name] = (scrape_time, content)
+
+        self.conn.executemany(UPSERT_SNAPSHOT_SQL, [snapshot for snapshot, _ in changed])
+        snapshot_ids = []
+        tier_rows = []
+        for snapshot, tiers in changed:
+            snapshot_id = self.conn.execute(SNAPSHOT_ID_SQL, (snapshot[0], snapshot[4])).fetchone()[0]
+            snapshot_ids.append((snapshot_id,))
+            tier_rows.extend((snapshot_id,) + tier for tier in tiers)
+        self.conn.executemany(DELETE_TIERS_SQL, snapshot_ids)
+        self.conn.executemany(INSERT_TIER_SQL, tier_rows)
+        # After the inserts, so a snapshot added earlier in this batch can be touched too
+        self.conn.executemany(TOUCH_SNAPSHOT_SQL, touches)
+        return unchanged
+
+    def flush(self):
+        """Write all queued rows in one transaction"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        written = len(self.written)
+        try:
+            with self.conn:
+                unchanged = self._write(batch)
+            self.written.extend(data for data, _ in batch)
+            self.unchanged.extend(unchanged)
+        except Exception:
+            # Retry row by row so one bad row doesn't lose the rest of the batch
+            with self.conn:
+                for item in batch:
+                    self.conn.execute('SAVEPOINT row')
+                    try:
+                        self.unchanged.extend(self._write([item]))
+                        self.written.append(item[0])
+                    except Exception as e:
+                        self.conn.execute('ROLLBACK TO row')
+                        self.failed.append((item[0]['name'], str(e)))
+                    self.conn.execute('RELEASE row')
+        if self.on_written is not None and len(self.written) > written:
+            self.on_written(self.written[written:])
+
+    def report(self):
+        """Print how many rows were written and which failed"""
+        print(f"\nWrote {len(self.written)} games to the database "
+              f"({len(self.unchanged)} unchanged since their last snapshot), {len(self.failed)} failed")
+        for name, error in self.failed:
+            print(f"- {name}: {error}")
+
 def store_scraper_data(data):
     """Store raw scraper data in new database structure"""
+    with ScraperDataWriter() as writer:
+        writer.add(data)
+    if writer.failed:
+        print(f"Database error storing {data.get('name')}: {writer.failed[0][1]}")
+    elif writer.unchanged:
+        print(f"{data['name']} unchanged since its last snapshot")
+    else:
+        print(f"Stored {len(data['prize_amounts'])} prize tiers for {data['name']}")
+    return not writer.failed
+
+def analysis_row(data, timestamp=None):
+    """Build the scratchers values for one analysis result"""
+    return (data['name'],
+            timestamp or datetime.utcnow().isoformat(),
+            data['remaining_winning_tickets'],
+            data['current_odds'],
+            data['prize_pool_remaining'],
+            data['ticket_cost'],
+            data['value_retention'])
+
+def store_analysis_many(records, db_path=None):
+    """Store a list of analysis results in one transaction; returns [(name, error)] for failed rows"""
+    timestamp = datetime.utcnow().isoformat()
+    rows = []
+    failed = []
+    for data in records:
+        try:
+            rows.append(analysis_row(data, timestamp))
+        except Exception as e:
+            failed.append((data.get('name'), f"Invalid data: {e}"))
     try:
-        with closing(sqlite3.connect('scratcher_data.db')) as conn:
-            # Begin with the basic columns: add image_url here.
-            columns = ['name', 'cost', 'odds', 'image_url']
-            values = [data['name'], data['cost'], data['odds'], data['image_url']]
-            
-            # Sort prize tiers by amount descending.
-            prize_tiers = sorted(zip(
-                data['prize_amounts'], 
-                data['total_prizes'], 
-                data['remaining_prizes']
-            ), reverse=True)
-            
-            # Add however many prize tiers this game has (up to 20).
-            for i, (amount, total, remaining) in enumerate(prize_tiers[:20], 1):
-                columns.extend([
-                    f'prize{i}_amount',
-                    f'prize{i}_total',
-                    f'prize{i}_remaining'
-                ])
-                values.extend([amount, total, remaining])
-            
-            # Fill remaining prize tier columns with NULL.
-            for i in range(len(prize_tiers) + 1, 21):
-                columns.extend([
-                    f'prize{i}_amount',
-                    f'prize{i}_total',
-                    f'prize{i}_remaining'
-                ])
-                values.extend([None, None, None])
-            
-            # Append the scrape_time column (this remains as the final column).
-            columns.append('scrape_time')
-            values.append(data['scrape_time'])
-            
-            # Build dynamic SQL query.
-            placeholders = ','.join(['?' for _ in values])
-            columns_str = ','.join(columns)
-            
-            query = f'''INSERT OR REPLACE INTO scraper_data 
-                ({columns_str}) VALUES ({placeholders})'''
-            
-            conn.execute(query, values)
-            conn.commit()
-            print(f"Stored {len(prize_tiers)} prize tiers for {data['name']}")
-            
+        with closing(configure_connection(sqlite3.connect(db_path or DB_PATH))) as conn:
+            with conn:
+                conn.executemany(INSERT_ANALYSIS_SQL, rows)
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
-        print(f"Failed query: {query}")
-        print(f"Values: {values}")
-    except Exception as e:
-        print(f"Error storing data: {e}")
+        failed.extend((row[0], str(e)) for row in rows)
+    for name, error in failed:
+        print(f"Database error storing analysis for {name}: {error}")
+    return failed
 
 def store_analysis_data(data):
     """Store analysis results in the database"""
-    try:
-        with closing(sqlite3.connect('scratcher_data.db')) as conn:
-            conn.execute('''INSERT INTO scratchers 
-                (name, timestamp, remaining_prizes, current_odds, 
-                 prize_pool, ticket_cost, value_retention)
-                VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                (data['name'], 
-                 datetime.utcnow().isoformat(),
-                 data['remaining_winning_tickets'],
-                 data['current_odds'],
-                 data['prize_pool_remaining'],
-                 data['ticket_cost'],
-                 data['value_retention']))
-            conn.commit()
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-    except Exception as e:
-        print(f"Error storing data: {e}")
\ No newline at end of file
+    return not store_analysis_many([data])
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Tier sums per snapshot, reduced in primary key order without a sort
+TIER_SUMS_QUERY = '''
+    SELECT snapshot_id, SUM(total), SUM(remaining), SUM(amount * remaining)
+    FROM prize_tiers
+    WHERE snapshot_id > ?
+    GROUP BY snapshot_id
+'''
+
+SNAPSHOTS_AFTER_QUERY = '''
+    SELECT id AS snapshot_id, name, scrape_time, cost, odds
+    FROM snapshots
+    WHERE id > ?
+    ORDER BY id
+'''
+
+def aggregate_tiers(tier_snapshot, amount, total, remaining, n_snapshots):
+    """Sum tier arrays per snapshot; tier_snapshot holds each tier's snapshot position"""
+    total_winning = np.bincount(tier_snapshot, weights=total, minlength=n_snapshots)
+    remaining_winning = np.bincount(tier_snapshot, weights=remaining, minlength=n_snapshots)
+    prize_pool = np.bincount(tier_snapshot, weights=amount * remaining, minlength=n_snapshots)
+    return total_winning, remaining_winning, prize_pool
+
+def compute_snapshot_metrics(cost, odds, total_winning, remaining_winning, prize_pool):
+    """Ticket counts, percent remaining, current odds and net EV for every snapshot.
+
+    All arguments are arrays of the same length; returns a dict of arrays.
+    The numbers match calculate_game_totals / calculate_ev_new in
+    analysis_engine.py, computed over whole arrays instead of one game's
+    tier list at a time.
+    """
+    cost = np.asarray(cost, dtype=float)
+    odds = np.asarray(odds, dtype=float)
+    total_winning = np.asarray(total_winning, dtype=float)
+    remaining_winning = np.asarray(remaining_winning, dtype=float)
+    prize_pool = np.asarray(prize_pool, dtype=float)
+
+    total_tickets = np.trunc(total_winning * odds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        remaining_tickets = np.where(
+            total_winning > 0,
+            np.trunc(remaining_winning / total_winning * total_tickets),
+            0.0
+        )
+        percent_remaining = np.where(total_tickets > 0, remaining_tickets / total_tickets * 100, 0.0)
+        has_tickets = (remaining_winning > 0) & (remaining_tickets > 0)
+        net_ev = np.where(has_tickets, prize_pool / remaining_tickets - cost, -cost)
+        current_odds = np.where(remaining_winning > 0, remaining_tickets / remaining_winning, np.inf)
+
+    return {
+        'total_tickets': total_tickets.astype(np.int64),
+        'remaining_tickets': remaining_tickets.astype(np.int64),
+        'total_winning': total_winning.astype(np.int64),
+        'remaining_winning': remaining_winning.astype(np.int64),
+        'claimed_winning': (total_winning - remaining_winning).astype(np.int64),
+        'percent_remaining': percent_remaining,
+        'prize_pool_remaining': prize_pool,
+        'current_odds': current_odds,
+        'net_ev': net_ev
+    }
+
+def compute_tier_metrics(tier_snapshot, remaining, snapshot_metrics):
+    """Each tier's share of remaining winners (%) and its current odds (1 in N)"""
+    remaining = np.asarray(remaining, dtype=float)
+    remaining_winning = snapshot_metrics['remaining_winning'][tier_snapshot]
+    remaining_tickets = snapshot_metrics['remaining_tickets'][tier_snapshot]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(remaining_winning > 0, remaining / remaining_winning * 100, 0.0)
+        odds = np.where(remaining > 0, remaining_tickets / remaining, np.inf)
+    return {'percentage': share, 'current_odds': odds}
+
+def tier_arrays(latest):
+    """Flatten the prize tiers of a list of (snapshot, prize_tiers) pairs into arrays.
+
+    Returns (tier_snapshot, tier_offsets, amount, total, remaining), where
+    tier_snapshot holds each tier's position in latest and the tiers of
+    snapshot i are [tier_offsets[i]:tier_offsets[i + 1]].
+    """
+    counts = np.array([len(tiers) for _, tiers in latest], dtype=np.int64)
+    tier_offsets = np.concatenate(([0], np.cumsum(counts)))
+    tier_snapshot = np.repeat(np.arange(len(latest)), counts)
+    amount = np.array([tier['amount'] for _, tiers in latest for tier in tiers], dtype=float)
+    total = np.array([tier['total'] for _, tiers in latest for tier in tiers], dtype=float)
+    remaining = np.array([tier['remaining'] for _, tiers in latest for tier in tiers], dtype=float)
+    return tier_snapshot, tier_offsets, amount, total, remaining
+
+def compute_game_metrics(latest):
+    """Vectorized metrics for a list of (snapshot, prize_tiers) pairs.
+
+    Returns (snapshot_metrics, tier_metrics, tier_offsets), where the tiers
+    of snapshot i are tier_metrics[...][tier_offsets[i]:tier_offsets[i + 1]].
+    """
+    tier_snapshot, tier_offsets, amount, total, remaining = tier_arrays(latest)
+
+    sums = aggregate_tiers(tier_snapshot, amount, total, remaining, len(latest))
+    snapshot_metrics = compute_snapshot_metrics(
+        [snapshot['cost'] for snapshot, _ in latest],
+        [snapshot['odds'] for snapshot, _ in latest],
+        *sums
+    )
+    tier_metrics = compute_tier_metrics(tier_snapshot, remaining, snapshot_metrics)
+    return snapshot_metrics, tier_metrics, tier_offsets
+
+def ev_history(conn, after_id=0):
+    """Net EV and ticket metrics for every snapshot past after_id, in id order, as a DataFrame.
+
+    Tier sums are reduced in SQLite, so only one row per snapshot reaches
+    Python; snapshots without tiers get zero sums.
+    """
+    history = pd.read_sql(SNAPSHOTS_AFTER_QUERY, conn, params=(after_id,))
+    sums = np.array(conn.execute(TIER_SUMS_QUERY, (after_id,)).fetchall(), dtype=float).reshape(-1, 4)
+    tier_ids = sums[:, 0].astype(np.int64)
+    snapshot_ids = history['snapshot_id'].to_numpy()
+    position = np.searchsorted(tier_ids, snapshot_ids)
+    found = position < len(tier_ids)
+    found[found] = tier_ids[position[found]] == snapshot_ids[found]
+
+    def column(i):
+        values = np.zeros(len(snapshot_ids))
+        values[found] = sums[position[found], i]
+        return values
+
+    metrics = compute_snapshot_metrics(
+        history['cost'].to_numpy(), history['odds'].to_numpy(), column(1), column(2), column(3)
+    )
+    for key, values in metrics.items():
+        history[key] = values
+    return history
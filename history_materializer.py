@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+from contextlib import closing
+
+from db_handler import connect
+from ev_engine import ev_history
+from slugs import generate_slug
+
+# Stable names, appended in place: serve with revalidation rather than the
+# cache-forever headers of the Publisher's hashed files
+HISTORY_DIR = 'public/web_data/history'
+TAIL_BYTES = 4096   # Enough for the last line of a history file
+
+def init_watermark_table(conn):
+    """Create the table holding the last snapshot id each materializer has processed"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS history_watermark (
+        output TEXT PRIMARY KEY,
+        snapshot_id INTEGER NOT NULL
+    )''')
+
+def _get_watermark(conn, output_dir):
+    row = conn.execute(
+        'SELECT snapshot_id FROM history_watermark WHERE output = ?', (output_dir,)
+    ).fetchone()
+    return row[0] if row else 0
+
+def _set_watermark(conn, output_dir, snapshot_id):
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO history_watermark (output, snapshot_id) VALUES (?, ?)',
+                     (output_dir, snapshot_id))
+
+def _last_date(f):
+    """Date of the last complete line of an open history file, dropping a torn final line"""
+    f.seek(0, os.SEEK_END)
+    start = max(0, f.tell() - TAIL_BYTES)
+    f.seek(start)
+    tail = f.read()
+    if tail and not tail.endswith(b'\n'):
+        # A write cut short by a crash; the rerun writes that point again
+        tail = tail[:tail.rfind(b'\n') + 1]
+        f.truncate(start + len(tail))
+    lines = tail.splitlines()
+    return json.loads(lines[-1])['date'] if lines else None
+
+def append_points(path, points):
+    """Append points to a history file in place; returns how many were written.
+
+    A run that died before advancing the watermark may already have
+    appended some of these points. They were written in the same order, so
+    everything up to the file's last date is skipped; only the end of the
+    file is read.
+    """
+    with open(path, 'a+b') as f:
+        last = _last_date(f)
+        dates = [point['date'] for point in points]
+        if last in dates:
+            points = points[dates.index(last) + 1:]
+        if points:
+            f.write(''.join(json.dumps(point, separators=(',', ':')) + '\n' for point in points).encode('utf-8'))
+    # Compressed copies from older versions would go stale, and appending can't keep them current
+    for suffix in ('.gz', '.br'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    return len(points)
+
+def materialize_history(output_dir=HISTORY_DIR, rebuild=False):
+    """Append snapshots newer than the stored watermark to per-game history files.
+
+    Each game gets <output_dir>/<slug>.jsonl with one JSON object per
+    snapshot: date, remaining_prizes (winning tickets left),
+    prize_pool_remaining and net_ev. Lines are appended in snapshot id
+    order, which is scrape order except for backfilled data, so readers
+    should sort by date. Only snapshots past the watermark are read and
+    only new lines are written, so a nightly run costs as much as the new
+    data. A run interrupted before the watermark moved can simply be rerun
+    (see append_points). rebuild=True starts over. Returns the number of
+    snapshots appended.
+    """
+    with closing(connect()) as conn:
+        init_watermark_table(conn)
+        # Missing output (e.g. a fresh checkout) can't be appended to, so start over
+        if rebuild or not os.path.isdir(output_dir):
+            shutil.rmtree(output_dir, ignore_errors=True)
+            _set_watermark(conn, output_dir, 0)
+        watermark = _get_watermark(conn, output_dir)
+
+        new = ev_history(conn, watermark)
+        if new.empty:
+            print("History is up to date")
+            return 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        for name, rows in new.groupby('name', sort=False):
+            points = rows[['scrape_time', 'remaining_winning', 'prize_pool_remaining', 'net_ev']] \
+                .rename(columns={'scrape_time': 'date', 'remaining_winning': 'remaining_prizes'}) \
+                .to_dict('records')
+            append_points(os.path.join(output_dir, f"{generate_slug(name)}.jsonl"), points)
+
+        # Only advance the watermark once every file has been appended
+        _set_watermark(conn, output_dir, int(new['snapshot_id'].max()))
+        print(f"Appended {len(new)} snapshots to history for {new['name'].nunique()} games")
+        return len(new)
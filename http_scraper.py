@@ -0,0 +1,240 @@
+import re
+import sys
+import json
+from datetime import datetime
+from html.parser import HTMLParser
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from prizes import parse_prize_amount
+from worker_pool import HostRateLimiter
+from scrape_metrics import METRICS
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+             'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+class Node:
+    """Minimal DOM node built from server-rendered HTML"""
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or [])
+        self.parent = parent
+        self.children = []
+
+    @property
+    def classes(self):
+        return self.attrs.get('class') or ''
+
+    def text(self):
+        parts = []
+        for child in self.children:
+            parts.append(child if isinstance(child, str) else child.text())
+        return ''.join(parts)
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, predicate):
+        return [node for node in self.iter() if predicate(node)]
+
+    def find(self, predicate):
+        return next((node for node in self.iter() if predicate(node)), None)
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document')
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open tag, tolerating unclosed children
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+def parse_html(html):
+    """Parse an HTML document into a Node tree"""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def _cell_text(cell):
+    """Text of a table cell's <p>, like the './/td[n]//p' lookup in scraper.py"""
+    p = cell.find(lambda n: n.tag == 'p')
+    return (p or cell).text().strip()
+
+def parse_game_page(html, scrape_time=None):
+    """Extract the fields scrape_game_details returns from a rendered game page.
+
+    Mirrors the XPath lookups in scraper.scrape_game_details so the result can
+    go straight into store_scraper_data. Returns None if the page doesn't
+    contain the game header and prize table (e.g. a client-only shell).
+    """
+    root = parse_html(html)
+
+    h1 = root.find(lambda n: n.tag == 'h1' and 'MuiTypography' in n.classes)
+    cost_span = root.find(
+        lambda n: n.tag == 'span' and 'MuiTypography-h6' in n.classes and '$' in n.text()
+    )
+    odds_p = root.find(lambda n: n.tag == 'p' and 'Overall Odds' in n.text())
+    table = root.find(
+        lambda n: n.tag == 'table'
+        and n.find(lambda th: th.tag == 'th' and 'Prize Amount' in th.text()) is not None
+    )
+    if h1 is None or cost_span is None or odds_p is None or table is None:
+        return None
+
+    name = h1.text().strip()
+    cost = float(cost_span.text().strip().replace("$", ""))
+    # The odds value sits next to the label, inside the label's parent div
+    odds_match = re.search(r"1 in ([\d.]+)", odds_p.parent.text())
+    if not odds_match:
+        return None
+    odds = float(odds_match.group(1))
+
+    image_url = None
+    media = root.find(
+        lambda n: n.tag == 'div' and 'MuiCardMedia-root' in n.classes
+        and 'background-image' in n.attrs.get('style', '')
+    )
+    if media is not None:
+        style_attr = media.attrs['style'].replace("&quot;", "\"")
+        match = re.search(r'url\(["\']?(.+?)["\']?\)', style_attr)
+        if match:
+            image_url = match.group(1)
+
+    prize_amounts = []
+    total_prizes = []
+    remaining_prizes = []
+    tbody = table.find(lambda n: n.tag == 'tbody') or table
+    for row in tbody.find_all(lambda n: n.tag == 'tr'):
+        cells = [c for c in row.children if isinstance(c, Node) and c.tag == 'td']
+        if len(cells) < 3:
+            continue
+        try:
+            prize = parse_prize_amount(_cell_text(cells[0]))
+            total = int(_cell_text(cells[1]).replace(",", ""))
+            remaining = int(_cell_text(cells[2]).replace(",", ""))
+        except ValueError as row_error:
+            print(f"Error processing row: {row_error}")
+            continue
+        prize_amounts.append(prize)
+        total_prizes.append(total)
+        remaining_prizes.append(remaining)
+
+    return {
+        'name': name,
+        'cost': cost,
+        'odds': odds,
+        'prize_amounts': prize_amounts,
+        'total_prizes': total_prizes,
+        'remaining_prizes': remaining_prizes,
+        'scrape_time': scrape_time or datetime.utcnow().isoformat(),
+        'image_url': image_url
+    }
+
+def create_session(pool_size=10):
+    """Create a keep-alive session with a connection pool sized for pool_size threads"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml'})
+    return session
+
+def fetch_game_details(session, url, timeout=15):
+    """Fetch one game page over HTTP and parse it; returns None on failure"""
+    with METRICS.game(url) as game:
+        try:
+            with METRICS.timer('http_fetch'):
+                response = session.get(url, timeout=timeout)
+                response.raise_for_status()
+            with METRICS.timer('parse'):
+                results = parse_game_page(response.text)
+            if results:
+                results['url'] = url
+                game['name'] = results['name']
+                METRICS.count('http_games_fetched')
+            else:
+                METRICS.count('http_games_unparsed')
+            return results
+        except Exception as e:
+            print(f"Error fetching {url}: {str(e)}")
+            METRICS.count('http_games_failed')
+            return None
+
+def fetch_all_game_details(urls, store_fn, workers=8, rate=0, claim_fn=None):
+    """Fetch every URL over pooled HTTP connections and store the results.
+
+    At most `workers` fetches are in flight; claim_fn(url), if given, is
+    called as each one is dispatched. claim_fn and store_fn are only called
+    from the calling thread. Returns the list of URLs that couldn't be
+    parsed, so the caller can retry them in the browser.
+    """
+    session = create_session(pool_size=workers)
+    limiter = HostRateLimiter(rate)
+
+    def fetch(url):
+        limiter.wait(url)
+        return fetch_game_details(session, url)
+
+    failed = []
+    remaining = iter(urls)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+
+            def dispatch():
+                url = next(remaining, None)
+                if url is not None:
+                    if claim_fn is not None:
+                        claim_fn(url)
+                    futures[executor.submit(fetch, url)] = url
+
+            for _ in range(workers):
+                dispatch()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    results = future.result()
+                    if results:
+                        store_fn(results)
+                    else:
+                        failed.append(url)
+                    dispatch()
+    finally:
+        session.close()
+    print(f"\nHTTP engine: {len(urls) - len(failed)} games fetched, {len(failed)} need the browser")
+    return failed
+
+if __name__ == "__main__":
+    # Parse saved pages offline: python http_scraper.py page.html [...]
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8') as f:
+            print(json.dumps(parse_game_page(f.read()), indent=2))
@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+
+from scrape_metrics import METRICS, METRICS_DIR
+
+PROFILE_DIR = '.chrome-profiles'
+PAGE_WEIGHT_FILE = os.path.join(METRICS_DIR, 'page_weight.json')
+
+# Requests Chrome refuses outright in lean mode: images (the card image URL
+# is read from a style attribute, never downloaded), fonts, media,
+# stylesheets (MUI's styles are injected by its JS) and analytics
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*.css',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*hotjar.com*', '*clarity.ms*', '*newrelic.com*', '*nr-data.net*'
+]
+
+LEAN_ARGUMENTS = [
+    '--blink-settings=imagesEnabled=false',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-notifications',
+    '--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication',
+    '--mute-audio',
+    '--no-first-run',
+]
+
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.media_stream': 2,
+    'profile.default_content_setting_values.notifications': 2,
+    'profile.default_content_setting_values.geolocation': 2,
+}
+
+# Bytes fetched over the network for the current document and its
+# resources (cache hits and blocked requests count 0), and its load time
+PAGE_WEIGHT_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    bytes: (nav ? nav.transferSize : 0) + resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+    load_ms: nav ? (nav.loadEventEnd || nav.domContentLoadedEventEnd) - nav.startTime : null
+};
+"""
+
+def profile_dir():
+    """Persistent profile for the calling thread; Chrome can't share one between browsers"""
+    return os.path.abspath(os.path.join(PROFILE_DIR, threading.current_thread().name))
+
+def apply_lean_options(options):
+    """Add lean-mode switches, prefs and a persistent profile with its disk cache to ChromeOptions"""
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+    options.add_experimental_option('prefs', LEAN_PREFS)
+    profile = profile_dir()
+    os.makedirs(profile, exist_ok=True)
+    options.add_argument(f'--user-data-dir={profile}')
+    options.add_argument(f"--disk-cache-dir={os.path.join(profile, 'cache')}")
+
+def block_resources(driver):
+    """Have Chrome fail every request matching BLOCKED_URLS before it is sent"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+
+def record_page_weight(driver):
+    """Add the loaded page's network bytes and load time to the run metrics"""
+    try:
+        weight = driver.execute_script(PAGE_WEIGHT_JS)
+    except Exception:
+        return
+    METRICS.count('pages_weighed')
+    METRICS.count('bytes_downloaded', int(weight.get('bytes') or 0))
+    if weight.get('load_ms'):
+        METRICS.record('navigation_load', weight['load_ms'] / 1000)
+
+def report_page_weight(lean, path=PAGE_WEIGHT_FILE):
+    """Print this run's bytes and load time per page against the last run in the other mode.
+
+    Each mode's averages are kept in path, so a lean run can show what it
+    saved over the last full run and vice versa.
+    """
+    with METRICS._lock:
+        pages = METRICS.counters.get('pages_weighed', 0)
+        total_bytes = METRICS.counters.get('bytes_downloaded', 0)
+        loads = list(METRICS.phases.get('navigation_load', []))
+    if not pages:
+        return
+    mode, other = ('lean', 'full') if lean else ('full', 'lean')
+    current = {
+        'pages': pages,
+        'bytes_per_page': total_bytes / pages,
+        'load_seconds_per_page': sum(loads) / len(loads) if loads else None
+    }
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (FileNotFoundError, ValueError):
+        baseline = {}
+
+    print(f"\nPage weight ({mode} mode): {total_bytes / 2**20:.1f} MB downloaded over {pages} pages, "
+          f"{current['bytes_per_page'] / 1024:.0f} KB/page"
+          + (f", {current['load_seconds_per_page']:.2f}s load/page" if loads else ''))
+    previous = baseline.get(other)
+    if previous:
+        saved = previous['bytes_per_page'] - current['bytes_per_page']
+        line = f"  vs last {other} run: {saved / 1024:+.0f} KB/page saved"
+        if current['load_seconds_per_page'] is not None and previous.get('load_seconds_per_page'):
+            line += f", {previous['load_seconds_per_page'] - current['load_seconds_per_page']:+.2f}s/page load time saved"
+        print(line)
+
+    baseline[mode] = current
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from publisher import atomic_write
+
+MANIFEST = 'manifest.json'
+
+# Copies the rendered page without scripts or linked resources, so a replayed
+# page is static and never reaches back to the live site. Card links and the
+# next-page button are turned into plain navigations, since the React
+# handlers that do this on the live site don't survive the copy.
+SNAPSHOT_JS = r"""
+const [links, nextHref] = arguments;
+const root = document.documentElement.cloneNode(true);
+root.querySelectorAll('script, link, noscript').forEach(el => el.remove());
+const cards = root.querySelectorAll("div[class*='MuiCard-root']");
+(links || []).forEach(link => {
+    const card = cards[link.index];
+    if (!card || !link.href) return;
+    card.setAttribute('data-href', link.href);
+    const button = card.querySelector("button[class*='MuiCardActionArea-root']") || card;
+    button.setAttribute('onclick', 'location.href = ' + JSON.stringify(link.href));
+});
+const next = root.querySelector("button[aria-label='Goto Next page']");
+if (next && nextHref && !next.className.includes('Mui-disabled')) {
+    next.setAttribute('onclick', 'location.href = ' + JSON.stringify(nextHref));
+}
+return '<!DOCTYPE html>\n' + root.outerHTML;
+"""
+
+def page_key(url):
+    """Path and query of url, the part that identifies a page on any host"""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+def list_page_url(base_url, page):
+    """URL a recorded list page is replayed under; page 1 is base_url itself"""
+    return base_url if page == 1 else f"{base_url}?page={page}"
+
+class PageRecorder:
+    """Saves rendered list and game pages seen during a scrape for offline replay.
+
+    Pages go to <directory>/pages/<hash>.html and manifest.json maps each
+    page's path and query to its file. Disabled (every call a no-op) until
+    start() is called.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.list_path = None
+        self.pages = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def start(self, directory):
+        """Record into directory, keeping pages from earlier recordings there"""
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.list_path = manifest.get('list_path')
+        self.pages = manifest.get('pages', {})
+
+    def _save(self, url, html):
+        key = page_key(url)
+        filename = f"pages/{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.html"
+        atomic_write(os.path.join(self.directory, filename), html.encode('utf-8'))
+        # The manifest is rewritten every time, so an interrupted run still replays
+        with self._lock:
+            self.pages[key] = filename
+            manifest = {'list_path': self.list_path, 'pages': self.pages}
+            atomic_write(os.path.join(self.directory, MANIFEST),
+                         json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    def save_list_page(self, driver, base_url, page, cards):
+        """Save list page `page`, writing the given [{'index', 'href'}] card links into the markup"""
+        if not self.enabled:
+            return
+        self.list_path = page_key(base_url)
+        links = [{'index': card['index'], 'href': page_key(card['href'])}
+                 for card in cards if card.get('href')]
+        self._snapshot(driver, list_page_url(base_url, page), links,
+                       page_key(list_page_url(base_url, page + 1)))
+
+    def save_game_page(self, driver, url):
+        """Save a rendered game detail page"""
+        if not self.enabled:
+            return
+        self._snapshot(driver, url, [], None)
+
+    def _snapshot(self, driver, url, links, next_href):
+        # A page that can't be recorded shouldn't cost the scrape its data
+        try:
+            self._save(url, driver.execute_script(SNAPSHOT_JS, links, next_href))
+        except Exception as e:
+            print(f"Could not record {url}: {str(e)}")
+
+RECORDER = PageRecorder()
+
+def _handler(directory, pages, latency, jitter):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency or jitter:
+                time.sleep(latency + random.uniform(0, jitter))
+            filename = pages.get(self.path)
+            if filename is None:
+                self.send_error(404)
+                return
+            with open(os.path.join(directory, filename), 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+def start_replay_server(directory, port=0, latency=0.0, jitter=0.0):
+    """Serve a recording from a background thread.
+
+    Every response is delayed by latency plus up to jitter seconds. Returns
+    (server, base_url), where base_url is the recorded list page on the
+    local server; call server.shutdown() when done.
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    server = ThreadingHTTPServer(('127.0.0.1', port), _handler(directory, manifest['pages'], latency, jitter))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}{manifest['list_path']}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a recorded scrape for offline runs")
+    parser.add_argument("directory", help="Directory written by scraper.py --record")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default 8765)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(args.directory, args.port, args.latency, args.jitter)
+    print(f"Replaying {args.directory}; scrape it with:")
+    print(f"  python scraper.py --base-url {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import shutil
+from contextlib import closing
+
+import pandas as pd
+
+import db_handler
+from db_handler import connect, init_db
+
+EXPORT_DIR = 'exports/history'
+STATE_FILE = '_export.json'
+# Bump when the schema changes, so older exports are rewritten instead of mixed in
+EXPORT_FORMAT = 2
+
+MONTH_QUERY = '''
+    SELECT s.name, s.scrape_time, t.tier, s.cost, s.odds, t.amount, t.total, t.remaining, s.id AS snapshot_id
+    FROM snapshots s
+    JOIN prize_tiers t ON t.snapshot_id = s.id
+    WHERE s.scrape_time >= ? AND s.scrape_time < ?
+    ORDER BY s.name, s.scrape_time, t.tier
+'''
+
+CHANGED_MONTHS_QUERY = '''
+    SELECT DISTINCT substr(scrape_time, 1, 7)
+    FROM snapshots
+    WHERE id > ?
+'''
+
+def _pyarrow():
+    """Import pyarrow on first use, so the rest of the pipeline runs without it"""
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("The Parquet export needs pyarrow: pip install -r requirements.txt")
+
+def history_schema(pa):
+    return pa.schema([
+        ('name', pa.dictionary(pa.int32(), pa.string())),
+        ('scrape_time', pa.timestamp('us')),
+        ('tier', pa.int8()),
+        ('cost', pa.float64()),
+        ('odds', pa.float64()),
+        ('amount', pa.float64()),
+        ('total', pa.int64()),
+        ('remaining', pa.int64()),
+        ('snapshot_id', pa.int64()),
+    ])
+
+def _next_month(month):
+    year, number = map(int, month.split('-'))
+    return f"{year + number // 12}-{number % 12 + 1:02d}"
+
+def _read_state(directory):
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'snapshot_id': 0, 'months': {}}
+
+def write_month(conn, directory, month, pa):
+    """Rewrite one month=YYYY-MM partition from the database; returns its row count"""
+    frame = pd.read_sql(MONTH_QUERY, conn, params=(month, _next_month(month)))
+    # isoformat() leaves out the fraction when it is zero, so one month can hold both forms
+    frame['scrape_time'] = pd.to_datetime(frame['scrape_time'], format='ISO8601')
+    table = pa.Table.from_pandas(frame, schema=history_schema(pa), preserve_index=False)
+
+    partition = os.path.join(directory, f"month={month}")
+    tmp = os.path.join(directory, f".month={month}.tmp")  # Dot files are skipped by readers
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    pa.parquet.write_table(table, os.path.join(tmp, 'part-0.parquet'), compression='zstd')
+    # Swap the finished partition in so readers never see half of it
+    shutil.rmtree(partition, ignore_errors=True)
+    os.replace(tmp, partition)
+    return len(frame)
+
+def export_history(directory=EXPORT_DIR, full=False):
+    """Export snapshot and prize tier history to month-partitioned Parquet files.
+
+    Rows are in long form, one per (game, scrape_time, tier), under
+    <directory>/month=YYYY-MM/. Only the last exported month and months
+    holding snapshots added since the previous export are rewritten;
+    full=True rewrites everything (needed after compaction.py removes
+    snapshots). Returns the number of months written.
+    """
+    pa = _pyarrow()
+    init_db()  # Creates the scrape_time index the month queries rely on
+    state = _read_state(directory)
+    if state.get('format') != EXPORT_FORMAT:
+        full = True
+    if full:
+        state = {'format': EXPORT_FORMAT, 'snapshot_id': 0, 'months': {}}
+        shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+    with closing(connect()) as conn:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM snapshots').fetchone()[0]
+        months = {month for month, in conn.execute(CHANGED_MONTHS_QUERY, (state['snapshot_id'],))}
+        if state['months']:
+            # Rows rewritten in place (same game and scrape_time) keep their id, so
+            # always refresh the newest month, which is where that happens
+            months.add(max(state['months']))
+        if not months:
+            print("Parquet export is up to date")
+            return 0
+        for month in sorted(months):
+            state['months'][month] = write_month(conn, directory, month, pa)
+
+    state['snapshot_id'] = last_id
+    with open(os.path.join(directory, STATE_FILE), 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    print(f"Exported {sum(state['months'][month] for month in months)} tier rows in {len(months)} "
+          f"monthly partitions to {directory}")
+    return len(months)
+
+def load_history(directory=EXPORT_DIR, names=None, start=None, end=None, columns=None, as_table=False):
+    """Read exported history into a DataFrame, memory-mapping the files.
+
+    names limits the games, start/end ('YYYY-MM-DD...' strings, end
+    inclusive) the scrape times; partitions outside start/end aren't
+    opened and only the requested columns are read. as_table=True returns
+    the pyarrow Table instead.
+    """
+    pa = _pyarrow()
+    ds = pa.dataset
+    dataset = ds.dataset(
+        directory, format='parquet', filesystem=pa.fs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+        exclude_invalid_files=True
+    )
+    filters = []
+    if names is not None:
+        filters.append(ds.field('name').isin(list(names)))
+    if start:
+        filters.append(ds.field('month') >= start[:7])
+        filters.append(ds.field('scrape_time') >= pa.scalar(pd.Timestamp(start), pa.timestamp('us')))
+    if end:
+        end_time = pd.Timestamp(end)
+        if len(end) <= 10:
+            end_time += pd.Timedelta(days=1)  # A date-only end includes that whole day
+        filters.append(ds.field('month') <= end[:7])
+        filters.append(ds.field('scrape_time') < pa.scalar(end_time, pa.timestamp('us')))
+    condition = None
+    for part in filters:
+        condition = part if condition is None else condition & part
+
+    table = dataset.to_table(columns=columns, filter=condition)
+    return table if as_table else table.to_pandas()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export snapshot history to monthly Parquet partitions")
+    parser.add_argument("--dir", default=EXPORT_DIR, help=f"Export directory (default {EXPORT_DIR})")
+    parser.add_argument("--full", action='store_true', help="Rewrite every partition instead of only new data")
+    parser.add_argument("--db", help=f"SQLite database to export (default {db_handler.DB_PATH})")
+    args = parser.parse_args()
+
+    if args.db:
+        db_handler.DB_PATH = args.db
+    export_history(args.dir, full=args.full)
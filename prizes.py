@@ -0,0 +1,14 @@
+def parse_prize_amount(text):
+    """
+    Convert a prize amount string (which might contain words like 'Million' or 'Thousand')
+    into a float. For example, '5 Million' becomes 5000000.0.
+    """
+    s = text.replace("$", "").replace(",", "").strip().lower()
+    if "million" in s:
+        number_str = s.replace("million", "").strip()
+        return float(number_str) * 1_000_000
+    elif "thousand" in s:
+        number_str = s.replace("thousand", "").strip()
+        return float(number_str) * 1_000
+    else:
+        return float(s)
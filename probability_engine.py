@@ -0,0 +1,141 @@
+import numpy as np
+
+from ev_engine import tier_arrays
+
+# Ticket bundle sizes the site reports probabilities for
+BUNDLE_SIZES = (1, 5, 10, 20)
+
+# Upper bound on the break-even DP's states per game; games whose prizes
+# would need more are counted in a coarser unit, rounding prizes down
+MAX_STATES = 1000
+
+def hit_probability(population, successes, bundle_sizes=BUNDLE_SIZES):
+    """P(at least one success in n draws without replacement), one row per population.
+
+    Hypergeometric: 1 - prod_{i<n} (1 - K / (M - i)), evaluated as a
+    cumulative sum of log1p terms for every n up to max(bundle_sizes) at
+    once. Returns an array of shape (len(population), len(bundle_sizes)).
+    """
+    population = np.asarray(population, dtype=float)[:, None]
+    successes = np.asarray(successes, dtype=float)[:, None]
+    left = population - np.arange(max(bundle_sizes))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Once a draw must hit (K >= tickets left), the miss probability is 0
+        ratio = np.clip(np.where(left > 0, successes / left, 1.0), 0.0, 1.0)
+        log_miss = np.cumsum(np.log1p(-ratio), axis=1)
+    miss = np.exp(log_miss[:, np.asarray(bundle_sizes) - 1])
+    return np.where(successes > 0, 1.0 - miss, 0.0)
+
+def winnings_variance(remaining_tickets, prize_pool, prize_square_sum, bundle_sizes=BUNDLE_SIZES):
+    """Variance of the total won on n tickets drawn without replacement.
+
+    Uses the per-ticket prize variance with the finite population
+    correction (M - n) / (M - 1). Returns shape (games, len(bundle_sizes)).
+    """
+    tickets = np.asarray(remaining_tickets, dtype=float)[:, None]
+    n = np.asarray(bundle_sizes, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.asarray(prize_pool, dtype=float)[:, None] / tickets
+        per_ticket = np.asarray(prize_square_sum, dtype=float)[:, None] / tickets - mean ** 2
+        correction = np.clip(tickets - n, 0.0, None) / (tickets - 1)
+        variance = n * per_ticket * correction
+    return np.where(tickets > 1, np.clip(variance, 0.0, None), 0.0)
+
+def break_even_probability(cost, remaining_tickets, tier_snapshot, tier_index, amount, remaining,
+                           bundle_sizes=BUNDLE_SIZES, max_states=MAX_STATES):
+    """P(a bundle of n tickets wins back at least its price) for every game.
+
+    Tickets are treated as drawn with replacement, which is accurate while
+    n is tiny next to the remaining ticket count. The distribution of the
+    bundle's winnings is built up one ticket at a time for all games
+    together, in integer units that divide the ticket cost and every prize
+    below the largest target, tracking only totals still short of the
+    target; mass that reaches it never comes back, since prizes are >= 0.
+    """
+    cost = np.asarray(cost, dtype=float)
+    tickets = np.asarray(remaining_tickets, dtype=float)
+    amount = np.asarray(amount, dtype=float)
+    n_games = len(cost)
+    max_n = max(bundle_sizes)
+
+    # Work in cents; prizes at or above the largest target all just reach it
+    target = np.round(cost * 100).astype(np.int64) * max_n
+    cents = np.round(np.minimum(amount, cost[tier_snapshot] * max_n) * 100).astype(np.int64)
+    unit = target.copy()
+    np.gcd.at(unit, tier_snapshot, cents)
+    unit = np.maximum(np.maximum(unit, -(-target // max_states)), 1)
+
+    # Each tier as a shift in units and a per-ticket probability, one row per game
+    widths = -(-target // unit)
+    shift = np.full((n_games, int(np.max(tier_index, initial=0)) + 1), np.max(widths, initial=1),
+                    dtype=np.int64)
+    shift[tier_snapshot, tier_index] = cents // unit[tier_snapshot]
+    prob = np.zeros(shift.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prob[tier_snapshot, tier_index] = np.where(tickets[tier_snapshot] > 0,
+                                                   np.asarray(remaining) / tickets[tier_snapshot], 0.0)
+    # Inconsistent counts (more winners than tickets) would otherwise create mass
+    prob /= np.maximum(prob.sum(axis=1, keepdims=True), 1.0)
+
+    # Cutoffs: winnings strictly below n * cost, in units rounded up
+    cost_cents = target // max_n
+    cutoffs = -(-(cost_cents[:, None] * np.asarray(bundle_sizes)) // unit[:, None])
+
+    # Games needing similar numbers of states run together, so a few $50
+    # games don't pad the $1 games out to their width
+    short = np.zeros((n_games, len(bundle_sizes)))
+    buckets = np.ceil(np.log2(np.maximum(widths, 1))).astype(np.int64)
+    for bucket in np.unique(buckets):
+        rows = np.flatnonzero(buckets == bucket)
+        short[rows] = _shortfall(shift[rows], prob[rows], int(widths[rows].max()),
+                                 cutoffs[rows], bundle_sizes)
+    return np.clip(1.0 - short, 0.0, 1.0)
+
+def _shortfall(shift, prob, width, cutoffs, bundle_sizes):
+    """P(winnings in units < cutoff) after each bundle size, for per-row tier shifts and probabilities"""
+    n_games = len(shift)
+    lose = np.clip(1.0 - prob.sum(axis=1), 0.0, 1.0)[:, None]
+    columns = [j for j in range(shift.shape[1]) if ((shift[:, j] < width) & (prob[:, j] > 0)).any()]
+
+    # Gather indices into [zeros | dist], so shifts past the start read zeros
+    states = np.arange(width)
+    sources = [width + states - np.minimum(shift[:, j, None], width) for j in columns]
+    dist = np.zeros((n_games, width))
+    dist[:, 0] = 1.0
+    short = np.zeros((n_games, len(bundle_sizes)))
+    padded = np.zeros((n_games, 2 * width))
+    for n in range(1, max(bundle_sizes) + 1):
+        padded[:, width:] = dist
+        new = dist * lose
+        for j, source in zip(columns, sources):
+            new += prob[:, j, None] * np.take_along_axis(padded, source, axis=1)
+        dist = new
+        if n in bundle_sizes:
+            i = bundle_sizes.index(n)
+            below = np.concatenate((np.zeros((n_games, 1)), np.cumsum(dist, axis=1)), axis=1)
+            short[:, i] = np.take_along_axis(below, cutoffs[:, i, None], axis=1)[:, 0]
+    return short
+
+def compute_game_probabilities(latest, snapshot_metrics, bundle_sizes=BUNDLE_SIZES):
+    """Bundle probabilities for a list of (snapshot, prize_tiers) pairs.
+
+    snapshot_metrics comes from ev_engine.compute_game_metrics for the same
+    list. Returns a dict of arrays with one column per bundle size: per game
+    any_win, break_even and winnings_variance, and per tier tier_hit (laid
+    out like compute_game_metrics' tier arrays).
+    """
+    bundle_sizes = tuple(bundle_sizes)
+    tier_snapshot, tier_offsets, amount, _, remaining = tier_arrays(latest)
+    tier_index = np.arange(len(tier_snapshot)) - tier_offsets[tier_snapshot]
+    tickets = snapshot_metrics['remaining_tickets']
+    cost = np.array([snapshot['cost'] for snapshot, _ in latest], dtype=float)
+    prize_square_sum = np.bincount(tier_snapshot, weights=amount ** 2 * remaining, minlength=len(latest))
+
+    return {
+        'any_win': hit_probability(tickets, snapshot_metrics['remaining_winning'], bundle_sizes),
+        'break_even': break_even_probability(cost, tickets, tier_snapshot, tier_index, amount,
+                                             remaining, bundle_sizes),
+        'winnings_variance': winnings_variance(tickets, snapshot_metrics['prize_pool_remaining'],
+                                               prize_square_sum, bundle_sizes),
+        'tier_hit': hit_probability(tickets[tier_snapshot], remaining, bundle_sizes)
+    }
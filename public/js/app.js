@@ -19,10 +19,8 @@ class ScratcherAnalytics {
 
     async loadData() {
         try {
-            const response = await fetch('./web_data/current_analysis.json');
-            if (!response.ok) throw new Error('Failed to load game data');
-            
-            this.data = await response.json();
+            this.data = await fetchWebData('index.json');
+            if (!this.data) throw new Error('Failed to load game data');
             console.log('Loaded data:', this.data);
             
             this.updateDisplay();
@@ -77,7 +75,7 @@ class ScratcherAnalytics {
                             </div>
                         </div>
                     </div>
-                    <a href="game.html?game=${this.generateSlug(game.name)}" class="btn btn-primary w-100">
+                    <a href="game.html?game=${game.slug}" class="btn btn-primary w-100">
                         View Details
                     </a>
                 </div>
@@ -85,14 +83,6 @@ class ScratcherAnalytics {
         </div>`;
     }
 
-    generateSlug(name) {
-        return name
-            .toLowerCase()
-            .replace(/[^\w\s-]/g, '')
-            .replace(/[\s_-]+/g, '-')
-            .replace(/^-+|-+$/g, '');
-    }
-
     updateDisplay() {
         const searchTerm = this.searchInput.value.toLowerCase();
         const sortType = this.sortSelect.value;
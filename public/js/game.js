@@ -25,13 +25,8 @@ class GameDetails {
                 throw new Error('No game specified');
             }
 
-            // Load game data
-            const response = await fetch('./web_data/current_analysis.json');
-            if (!response.ok) throw new Error('Failed to load game data');
-            
-            const games = await response.json();
-            const game = games.find(g => this.generateSlug(g.name) === gameSlug);
-            
+            // Load only this game's data file
+            const game = await fetchWebData(`games/${generateSlug(gameSlug)}.json`);
             if (!game) {
                 throw new Error('Game not found');
             }
@@ -174,14 +169,6 @@ class GameDetails {
             }
         });
     }
-
-    generateSlug(name) {
-        return name
-            .toLowerCase()
-            .replace(/[^\w\s-]/g, '')
-            .replace(/[\s_-]+/g, '-')
-            .replace(/^-+|-+$/g, '');
-    }
 }
 
 // Initialize when DOM is ready
@@ -0,0 +1,9 @@
+// Shared by app.js and game.js; must match generate_slug() in slugs.py,
+// which names the per-game files in web_data/games/.
+function generateSlug(name) {
+    return name
+        .toLowerCase()
+        .replace(/[^\w\s-]/g, '')
+        .replace(/[\s_-]+/g, '-')
+        .replace(/^-+|-+$/g, '');
+}
@@ -0,0 +1,26 @@
+// Data files are published under content-hashed names (see publisher.py).
+// sitemap.json maps each logical name to its current file, so only the
+// manifest needs revalidating; the hashed files can be cached forever.
+let manifestPromise = null;
+
+function loadManifest() {
+    if (!manifestPromise) {
+        manifestPromise = fetch('./web_data/sitemap.json', { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) throw new Error('Failed to load site manifest');
+                return response.json();
+            });
+    }
+    return manifestPromise;
+}
+
+// Returns the parsed file, or null if the manifest doesn't list it
+async function fetchWebData(name) {
+    const manifest = await loadManifest();
+    const file = manifest.files && manifest.files[name];
+    if (!file) return null;
+
+    const response = await fetch(`./web_data/${file}`);
+    if (!response.ok) throw new Error(`Failed to load ${name}`);
+    return response.json();
+}
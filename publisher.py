@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped without the brotli package
+    brotli = None
+
+SITEMAP = 'sitemap.json'
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory and a rename"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _file_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def hashed_name(name, digest):
+    """'games/a.json' -> 'games/a.<first 12 hex digits>.json'"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:12]}{ext}"
+
+class Publisher:
+    """Writes web data files atomically, skipping unchanged ones, with .gz/.br siblings.
+
+    Files published with hashed=True get content-hashed names that can be
+    cached forever; sitemap.json (written by finish) maps each logical name
+    to its current hashed file. Files from the previous run's manifest are
+    kept for one more run so pages loaded mid-deploy still find them.
+    The per-game history files are not published here: they are appended
+    in place (see history_materializer.py), which hashed names would turn
+    into a full rewrite of every changed file.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.files = {}
+        self.written = 0
+        self.skipped = 0
+        try:
+            with open(os.path.join(output_dir, SITEMAP)) as f:
+                previous = json.load(f)
+        except (FileNotFoundError, ValueError):
+            previous = {}
+        self.previous_files = previous.get('files', {})
+        self.older_files = previous.get('previous_files', {})
+
+    def _write(self, relative_path, data):
+        path = os.path.join(self.output_dir, relative_path)
+        atomic_write(path, data)
+        atomic_write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            atomic_write(path + '.br', brotli.compress(data))
+        self.written += 1
+
+    def publish(self, name, obj, hashed=True):
+        """Serialize obj as compact JSON and publish it under the logical name; returns the file name"""
+        data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        target = hashed_name(name, digest) if hashed else name
+        path = os.path.join(self.output_dir, target)
+
+        if (hashed and os.path.exists(path)) or (not hashed and _file_digest(path) == digest):
+            self.skipped += 1
+        else:
+            self._write(target, data)
+        self.files[name] = target
+        return target
+
+    def _remove_stale(self):
+        """Delete hashed files two runs old that no current or previous manifest entry uses"""
+        keep = set(self.files.values()) | set(self.previous_files.values())
+        # Files published under their own name are overwritten in place, never left behind
+        stale = {target for name, target in self.older_files.items() if target != name} - keep
+        for target in stale:
+            for suffix in ('', '.gz', '.br'):
+                try:
+                    os.remove(os.path.join(self.output_dir, target + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def finish(self, **fields):
+        """Write sitemap.json with the manifest and any extra fields, then clean up old files"""
+        sitemap = dict(fields)
+        sitemap['last_updated'] = datetime.utcnow().isoformat()
+        sitemap['files'] = self.files
+        sitemap['previous_files'] = self.previous_files
+        data = json.dumps(sitemap, indent=2).encode('utf-8')
+        atomic_write(os.path.join(self.output_dir, SITEMAP), data)
+        self._remove_stale()
+        print(f"Published {self.written} changed files, {self.skipped} unchanged")
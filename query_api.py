@@ -0,0 +1,341 @@
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import db_handler
+from analysis_cache import ENGINE_VERSION, latest_scrape_times
+from analysis_engine import INDEX_FIELDS, analyze_snapshots, load_latest_snapshots
+from ev_engine import compute_snapshot_metrics
+from slugs import generate_slug
+
+DEFAULT_PORT = 8080
+PER_PAGE = 25
+MAX_PER_PAGE = 200
+CACHE_SIZE = 1024       # Responses kept in the LRU
+VERSION_CHECK = 1.0     # Seconds between checks for a new scrape
+
+# Sort keys for /games and the default direction of each (True = descending)
+SORT_KEYS = {
+    'net_ev': True,
+    'jackpot': True,
+    'prize_pool_remaining': True,
+    'percent_remaining': True,
+    'cost': False,
+    'current_odds': False,
+    'name': False,
+}
+
+CACHED_ANALYSES_QUERY = 'SELECT name, scrape_time, analysis FROM analysis_cache WHERE engine_version = ?'
+
+HISTORY_QUERY = '''
+    SELECT s.scrape_time, s.cost, s.odds,
+           COALESCE(SUM(t.total), 0), COALESCE(SUM(t.remaining), 0),
+           COALESCE(SUM(t.amount * t.remaining), 0)
+    FROM snapshots s
+    LEFT JOIN prize_tiers t ON t.snapshot_id = s.id
+    WHERE s.name = ? AND s.scrape_time >= ? AND s.scrape_time <= ?
+    GROUP BY s.id
+    ORDER BY s.scrape_time
+    LIMIT ? OFFSET ?
+'''
+
+HISTORY_COUNT_QUERY = '''
+    SELECT COUNT(*) FROM snapshots
+    WHERE name = ? AND scrape_time >= ? AND scrape_time <= ?
+'''
+
+class BadRequest(ValueError):
+    pass
+
+class NotFound(LookupError):
+    pass
+
+class ReadOnlyPool:
+    """A fixed set of read-only SQLite connections shared by the request threads"""
+
+    def __init__(self, db_path=None, size=4):
+        path = db_path or db_handler.DB_PATH
+        self._connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute('PRAGMA query_only = ON')
+            self._connections.put(conn)
+        self.size = size
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        for _ in range(self.size):
+            self._connections.get().close()
+
+class ResponseCache:
+    """LRU of encoded responses, dropped as a whole when the data version changes"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, version, body):
+        with self._lock:
+            if version != self.version:
+                return  # Computed from data that has since been replaced
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'size': self.size, 'hits': self.hits, 'misses': self.misses}
+
+def _int_param(params, name, default, low=1, high=None):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise BadRequest(f"{name} must be between {low} and {high}" if high else f"{name} must be at least {low}")
+    return value
+
+def _float_param(params, name):
+    if name not in params:
+        return None
+    try:
+        return float(params[name])
+    except ValueError:
+        raise BadRequest(f"{name} must be a number")
+
+def _paginate(params):
+    page = _int_param(params, 'page', 1)
+    per_page = _int_param(params, 'per_page', PER_PAGE, high=MAX_PER_PAGE)
+    return page, per_page
+
+class QueryService:
+    """Answers API requests from the latest analyses, reloaded when a new scrape lands.
+
+    Analyses come from analysis_engine's cache where it is current, and are
+    computed in memory for games it doesn't cover yet; the database is
+    never written to.
+    """
+
+    def __init__(self, pool, cache_size=CACHE_SIZE):
+        self.pool = pool
+        self.cache = ResponseCache(cache_size)
+        self.version = None
+        self.games = {}          # slug -> analysis
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def data_version(self):
+        """Latest scrape_time in the database, looked up at most every VERSION_CHECK seconds"""
+        now = time.monotonic()
+        if self.version is not None and now - self._checked < VERSION_CHECK:
+            return self.version
+        with self.pool.connection() as conn:
+            version = conn.execute('SELECT MAX(scrape_time) FROM snapshots').fetchone()[0]
+        with self._lock:
+            if version != self.version or not self.games:
+                self.games = self._load_games()
+                self.version = version
+            self._checked = now
+        return version
+
+    def _load_games(self):
+        with self.pool.connection() as conn:
+            scrape_times = latest_scrape_times(conn)
+            try:
+                cached = {name: json.loads(analysis)
+                          for name, scrape_time, analysis in conn.execute(CACHED_ANALYSES_QUERY, (ENGINE_VERSION,))
+                          if scrape_times.get(name) == scrape_time}
+            except sqlite3.OperationalError:
+                cached = {}  # analysis_engine.py hasn't run against this database yet
+            missing = [name for name in scrape_times if name not in cached]
+            fresh = analyze_snapshots(load_latest_snapshots(conn, missing)) if missing else []
+        analyses = list(cached.values()) + fresh
+        print(f"Loaded {len(analyses)} games ({len(cached)} from the analysis cache)")
+        return {generate_slug(game['name']): dict(game, slug=generate_slug(game['name']))
+                for game in sorted(analyses, key=lambda game: game['name'])}
+
+    def respond(self, path, params):
+        """Encoded JSON body for a GET request, from the LRU when possible"""
+        version = self.data_version()
+        if path.strip('/') == 'health':
+            # Live stats; a cached copy would report the cache as it was when first asked
+            return self._encode(self.health(), version)
+        key = path + '?' + '&'.join(f"{k}={v}" for k, v in sorted(params.items()))
+        body = self.cache.get(key, version)
+        if body is None:
+            body = self._encode(self._route(path, params), version)
+            self.cache.put(key, version, body)
+        return body
+
+    def _encode(self, result, version):
+        return json.dumps(dict(result, data_version=version), separators=(',', ':')).encode('utf-8')
+
+    def _route(self, path, params):
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if parts == ['games']:
+            return self.list_games(params)
+        if len(parts) == 2 and parts[0] == 'games':
+            return self.game(parts[1])
+        if len(parts) == 3 and parts[0] == 'games' and parts[2] == 'history':
+            return self.history(parts[1], params)
+        raise NotFound(f"No such endpoint: {path}")
+
+    def health(self):
+        """/health: games loaded and response cache stats"""
+        return {'games': len(self.games), 'cache': self.cache.stats()}
+
+    def list_games(self, params):
+        """/games: card fields of games matching the filters, ranked by `sort`"""
+        sort = params.get('sort', 'net_ev')
+        if sort not in SORT_KEYS:
+            raise BadRequest(f"sort must be one of {', '.join(SORT_KEYS)}")
+        order = params.get('order', 'desc' if SORT_KEYS[sort] else 'asc')
+        if order not in ('asc', 'desc'):
+            raise BadRequest("order must be asc or desc")
+        page, per_page = _paginate(params)
+        min_cost, max_cost = _float_param(params, 'min_cost'), _float_param(params, 'max_cost')
+        min_ev = _float_param(params, 'min_ev')
+        search = params.get('q', '').lower()
+
+        games = [
+            game for game in self.games.values()
+            if (min_cost is None or game['cost'] >= min_cost)
+            and (max_cost is None or game['cost'] <= max_cost)
+            and (min_ev is None or game['net_ev'] >= min_ev)
+            and search in game['name'].lower()
+        ]
+        if sort == 'percent_remaining':
+            sort_key = lambda game: game['ticket_data']['percent_remaining']
+        else:
+            sort_key = lambda game: game[sort]
+        games.sort(key=sort_key, reverse=order == 'desc')
+
+        start = (page - 1) * per_page
+        return {
+            'total': len(games),
+            'page': page,
+            'per_page': per_page,
+            'games': [dict({field: game[field] for field in INDEX_FIELDS}, slug=game['slug'],
+                           percent_remaining=game['ticket_data']['percent_remaining'])
+                      for game in games[start:start + per_page]]
+        }
+
+    def game(self, slug):
+        """/games/<slug>: the game's full analysis"""
+        if slug not in self.games:
+            raise NotFound(f"No game {slug}")
+        return {'game': self.games[slug]}
+
+    def history(self, slug, params):
+        """/games/<slug>/history: per-snapshot metrics between `from` and `to`, oldest first"""
+        if slug not in self.games:
+            raise NotFound(f"No game {slug}")
+        name = self.games[slug]['name']
+        page, per_page = _paginate(params)
+        start = params.get('from', '')
+        # A date-only `to` includes every scrape on that day
+        end = params.get('to', '9999') + '\x7f'
+
+        with self.pool.connection() as conn:
+            total = conn.execute(HISTORY_COUNT_QUERY, (name, start, end)).fetchone()[0]
+            rows = conn.execute(HISTORY_QUERY, (name, start, end, per_page, (page - 1) * per_page)).fetchall()
+
+        points = []
+        if rows:
+            scrape_times, cost, odds, total_winning, remaining_winning, prize_pool = zip(*rows)
+            metrics = compute_snapshot_metrics(cost, odds, total_winning, remaining_winning, prize_pool)
+            points = [
+                {'date': scrape_times[i],
+                 'remaining_prizes': int(metrics['remaining_winning'][i]),
+                 'prize_pool_remaining': float(metrics['prize_pool_remaining'][i]),
+                 'net_ev': float(metrics['net_ev'][i])}
+                for i in range(len(rows))
+            ]
+        return {'name': name, 'total': total, 'page': page, 'per_page': per_page, 'history': points}
+
+def _handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                body, status = service.respond(url.path, dict(parse_qsl(url.query))), 200
+            except BadRequest as e:
+                body, status = json.dumps({'error': str(e)}).encode('utf-8'), 400
+            except NotFound as e:
+                body, status = json.dumps({'error': str(e)}).encode('utf-8'), 404
+            except Exception as e:
+                print(f"Error handling {self.path}: {str(e)}")
+                body, status = json.dumps({'error': 'internal error'}).encode('utf-8'), 500
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+def start_query_server(db_path=None, host='127.0.0.1', port=DEFAULT_PORT, pool_size=4, cache_size=CACHE_SIZE):
+    """Serve the API from a background thread; returns (server, service).
+
+    Call server.shutdown() and service.pool.close() when done.
+    """
+    service = QueryService(ReadOnlyPool(db_path, pool_size), cache_size)
+    service.data_version()  # Load the games before the first request
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='query-server', daemon=True).start()
+    return server, service
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the scratcher database")
+    parser.add_argument("--host", default='127.0.0.1', help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--db", help=f"SQLite database to read (default {db_handler.DB_PATH})")
+    parser.add_argument("--pool-size", type=int, default=4, help="Read-only database connections (default 4)")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        help=f"Responses kept in memory (default {CACHE_SIZE})")
+    args = parser.parse_args()
+
+    server, service = start_query_server(args.db, args.host, args.port, args.pool_size, args.cache_size)
+    host, port = server.server_address[:2]
+    print(f"Serving {len(service.games)} games at http://{host}:{port}/games")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.pool.close()
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = 'metrics'
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, interpolating between closest ranks"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def summarize(values):
+    """Count, total and p50/p90/p99/max of a list of durations"""
+    return {
+        'count': len(values),
+        'total': round(sum(values), 4),
+        'p50': round(percentile(values, 50), 4),
+        'p90': round(percentile(values, 90), 4),
+        'p99': round(percentile(values, 99), 4),
+        'max': round(max(values), 4)
+    }
+
+class RunMetrics:
+    """Thread-safe phase timers and counters for one scraper run.
+
+    Timings recorded while a thread is inside game(url) are also added to
+    that game's record, so the metrics file can show where each game's time
+    went as well as percentiles over the whole run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started = time.monotonic()
+        self.phases = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.games = {}
+
+    def record(self, phase, seconds):
+        """Add one timing for phase, attributed to the current thread's game if any"""
+        game = getattr(self._local, 'game', None)
+        with self._lock:
+            self.phases[phase].append(seconds)
+            if game is not None:
+                game['phases'][phase] = game['phases'].get(phase, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def timer(self, phase):
+        """Time the body of a with block as one occurrence of phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    @contextmanager
+    def game(self, url):
+        """Attribute timings recorded by this thread inside the block to the game at url"""
+        with self._lock:
+            game = self.games.setdefault(url, {'url': url, 'name': None, 'phases': {}})
+        previous = getattr(self._local, 'game', None)
+        self._local.game = game
+        start = time.perf_counter()
+        try:
+            yield game
+        finally:
+            game['total'] = game.get('total', 0.0) + time.perf_counter() - start
+            self._local.game = previous
+
+    def on_wait(self, label, seconds, timed_out=False):
+        """wait_engine.WaitStats listener: records each wait as phase 'wait:<label>'"""
+        self.record(f"wait:{label}", seconds)
+        if timed_out:
+            self.count(f"wait_timeouts:{label}")
+
+    def write(self, path, **run_fields):
+        """Write the run as JSON lines: one run record, one per game, one per phase"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            phases = {phase: list(values) for phase, values in self.phases.items()}
+            games = [dict(game, phases=dict(game['phases'])) for game in self.games.values()]
+            counters = dict(self.counters)
+        run = dict(type='run', finished=datetime.utcnow().isoformat(),
+                   total_seconds=round(time.monotonic() - self.started, 3), counters=counters, **run_fields)
+        with open(path, 'w') as f:
+            f.write(json.dumps(run) + '\n')
+            for game in games:
+                game['phases'] = {phase: round(seconds, 4) for phase, seconds in game['phases'].items()}
+                game['total'] = round(game.get('total', 0.0), 4)
+                f.write(json.dumps(dict(type='game', **game)) + '\n')
+            for phase, values in sorted(phases.items()):
+                f.write(json.dumps(dict(type='phase', phase=phase, **summarize(values))) + '\n')
+            game_totals = [game['total'] for game in games if game['total']]
+            if game_totals:
+                f.write(json.dumps(dict(type='phase', phase='game_total', **summarize(game_totals))) + '\n')
+        return path
+
+    def print_summary(self):
+        """Print per-phase percentiles, slowest phases first"""
+        with self._lock:
+            phases = {phase: list(values) for phase, values in self.phases.items()}
+        print("\nPhase timings (seconds):")
+        for phase, values in sorted(phases.items(), key=lambda item: -sum(item[1])):
+            stats = summarize(values)
+            print(f"  {phase}: {stats['count']}x, {stats['total']:.1f} total, "
+                  f"p50 {stats['p50']:.2f}, p90 {stats['p90']:.2f}, p99 {stats['p99']:.2f}")
+
+METRICS = RunMetrics()
+
+def default_metrics_path():
+    """metrics/scrape-<UTC timestamp>.jsonl"""
+    return os.path.join(METRICS_DIR, f"scrape-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.jsonl")
@@ -0,0 +1,128 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from db_handler import connect
+
+# Games whose remaining winners move faster than this (fraction per day) are scraped every run
+FAST_VELOCITY = 0.005
+# Otherwise re-scrape once the expected change reaches this fraction of remaining winners
+TARGET_CHANGE = 0.01
+# Games with less than this fraction of winners left change too little to watch closely
+SOLD_OUT_FRACTION = 0.02
+# Forced full refresh: no game goes longer than this without a scrape
+MAX_INTERVAL_DAYS = 7
+# Snapshots used to estimate velocity
+HISTORY_WINDOW = 8
+# Slack so a daily job that starts a little early doesn't skip a game due that day
+DUE_SLACK = timedelta(hours=2)
+
+def init_schedule_table(conn):
+    """Create the table mapping game URLs to their next due time"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS game_schedule (
+        url TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        last_scraped DATETIME NOT NULL,
+        next_due DATETIME NOT NULL,
+        velocity REAL
+    )''')
+
+def _load_history(conn, name):
+    """Return [(scrape_time, [remaining per tier], total winners), ...] oldest first.
+
+    If the latest snapshot was seen again unchanged later, that sighting is
+    included as a final point, so quiet days count towards the velocity.
+    """
+    snapshots = conn.execute('''
+        SELECT id, scrape_time, last_seen
+        FROM snapshots
+        WHERE name = ?
+        ORDER BY scrape_time DESC
+        LIMIT ?
+    ''', (name, HISTORY_WINDOW)).fetchall()
+    if not snapshots:
+        return []
+    tiers = {snapshot_id: ([], 0) for snapshot_id, _, _ in snapshots}
+    rows = conn.execute(f'''
+        SELECT snapshot_id, remaining, total
+        FROM prize_tiers
+        WHERE snapshot_id IN ({','.join('?' for _ in snapshots)})
+        ORDER BY snapshot_id, tier
+    ''', [snapshot_id for snapshot_id, _, _ in snapshots]).fetchall()
+    for snapshot_id, remaining, total in rows:
+        remaining_list, total_winning = tiers[snapshot_id]
+        remaining_list.append(remaining)
+        tiers[snapshot_id] = (remaining_list, total_winning + total)
+    history = [
+        (datetime.fromisoformat(scrape_time),) + tiers[snapshot_id]
+        for snapshot_id, scrape_time, _ in reversed(snapshots)
+    ]
+    latest_id, latest_time, last_seen = snapshots[0]
+    if last_seen and last_seen > latest_time:
+        history.append((datetime.fromisoformat(last_seen),) + tiers[latest_id])
+    return history
+
+def estimate_velocity(history):
+    """Average fraction of remaining winners claimed per day, or None without enough history"""
+    claimed_fraction = 0.0
+    days = 0.0
+    for (prev_time, prev, _), (time, current, _) in zip(history, history[1:]):
+        elapsed = (time - prev_time).total_seconds() / 86400
+        if elapsed <= 0 or len(prev) != len(current) or sum(prev) == 0:
+            continue
+        claimed_fraction += sum(abs(p - c) for p, c in zip(prev, current)) / sum(prev)
+        days += elapsed
+    if days == 0:
+        return None
+    return claimed_fraction / days
+
+def next_interval(velocity, remaining_fraction):
+    """Days until a game is due again, given its velocity and share of winners left"""
+    if velocity is None or velocity >= FAST_VELOCITY:
+        return 0
+    if remaining_fraction < SOLD_OUT_FRACTION or velocity == 0:
+        return MAX_INTERVAL_DAYS
+    return min(TARGET_CHANGE / velocity, MAX_INTERVAL_DAYS)
+
+def _update_schedule(conn, url, name, scrape_time):
+    """Recompute a game's next due time after it has been scraped"""
+    history = _load_history(conn, name)
+    velocity = estimate_velocity(history)
+
+    remaining_winning = sum(history[-1][1]) if history else 0
+    total_winning = history[-1][2] if history else 0
+    remaining_fraction = remaining_winning / total_winning if total_winning else 0.0
+
+    interval = next_interval(velocity, remaining_fraction)
+    last_scraped = datetime.fromisoformat(scrape_time)
+    next_due = last_scraped + timedelta(days=interval)
+    conn.execute('''INSERT OR REPLACE INTO game_schedule
+        (url, name, last_scraped, next_due, velocity)
+        VALUES (?, ?, ?, ?, ?)''',
+        (url, name, last_scraped.isoformat(), next_due.isoformat(), velocity))
+
+def update_schedules(records):
+    """Recompute next due times for scrape results that have been stored"""
+    try:
+        with closing(connect()) as conn:
+            init_schedule_table(conn)
+            with conn:
+                for data in records:
+                    if data.get('url'):
+                        _update_schedule(conn, data['url'], data['name'], data['scrape_time'])
+    except sqlite3.Error as e:
+        print(f"Database error updating scrape schedule: {e}")
+
+def due_urls(urls, now=None):
+    """Return the URLs that are due for a scrape; games never scraped are always due"""
+    now = now or datetime.utcnow()
+    with closing(connect()) as conn:
+        init_schedule_table(conn)
+        next_due = dict(conn.execute('SELECT url, next_due FROM game_schedule').fetchall())
+
+    due = [
+        url for url in urls
+        if url not in next_due or datetime.fromisoformat(next_due[url]) - DUE_SLACK <= now
+    ]
+    print(f"Scheduler: {len(due)} of {len(urls)} games due, skipping {len(urls) - len(due)}")
+    return due
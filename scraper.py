@@ -2,19 +2,30 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, SessionNotCreatedException
 import time
 import re
-from db_handler import init_db, store_scraper_data
-from datetime import datetime
+from db_handler import init_db, ScraperDataWriter
+from worker_pool import driver_alive, run_worker_pool
+from crawl_queue import CrawlQueue, DISCOVERY_TTL
+from scrape_scheduler import due_urls, update_schedules
+from http_scraper import fetch_all_game_details
+from prizes import parse_prize_amount
+from wait_engine import (
+    configure as configure_waits, discard_network_log, print_wait_summary, timed_until, WAIT_STATS,
+    wait_for_change, wait_for_network_idle, wait_for_stable_count, wait_for_url_change
+)
+from scrape_metrics import METRICS, default_metrics_path
+from page_replay import RECORDER, start_replay_server
+from lean_browser import apply_lean_options, block_resources, record_page_weight, report_page_weight
+from browser_service import attach_driver, pinned_driver_path
+import db_handler
+from datetime import datetime, timedelta
 import os
 import argparse  # New import for command-line argument parsing
-from webdriver_manager.chrome import ChromeDriverManager, ChromeType
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeType
 import platform
-import subprocess
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import urlparse
 
 def wait_and_get_element(wait, by, selector, error_msg=""):
     """Helper function to wait for and get an element with better error handling"""
@@ -25,132 +36,222 @@ def wait_and_get_element(wait, by, selector, error_msg=""):
         print(f"Selector used: {selector}")
         raise
 
-def get_game_urls(driver, wait, base_url="https://azplayersclub.com/games/types/1", max_page=None):
+BASE_URL = "https://azplayersclub.com/games/types/1"
+
+CARD_XPATH = "//div[contains(@class, 'MuiCard-root')]"
+NEXT_PAGE_XPATH = "//button[@aria-label='Goto Next page']"
+# Scrape results are committed to the database in batches of this many games
+WRITE_BATCH_SIZE = 25
+# Failed games are retried within the run while their backoff is at most this many seconds
+MAX_INLINE_RETRY_WAIT = 120
+
+PRIZE_ROWS_XPATH = "//table[.//th[contains(., 'Prize Amount')]]//tbody/tr"
+
+# Titles of the cards currently shown; changes once the SPA has swapped pages
+CARD_TITLES_JS = """
+return Array.from(document.querySelectorAll("div[class*='MuiCard-root'] p[class*='MuiTypography-subtitle1']"))
+    .map(p => p.textContent).join('|');
+"""
+
+# Reads every active (blue-banner) card on the current list page in one call.
+# The link is taken from an anchor or data attribute when the card has one,
+# otherwise from the props React attached to the card's action button.
+ACTIVE_CARDS_JS = r"""
+const cards = Array.from(document.querySelectorAll("div[class*='MuiCard-root']"));
+const found = [];
+
+function fromProps(props) {
+    if (!props) return {};
+    const game = props.game || props.item || props.data || {};
+    return {
+        href: props.href || props.to || game.href || game.url || null,
+        gameId: props.gameId || game.gameId || game.id || null
+    };
+}
+
+function fromReact(el) {
+    const keys = Object.keys(el);
+    const propsKey = keys.find(k => k.startsWith('__reactProps$'));
+    let info = propsKey ? fromProps(el[propsKey]) : {};
+    if (info.href || info.gameId) return info;
+    const fiberKey = keys.find(k => k.startsWith('__reactFiber$'));
+    let fiber = fiberKey ? el[fiberKey] : null;
+    for (let depth = 0; fiber && depth < 15; depth++, fiber = fiber.return) {
+        info = fromProps(fiber.memoizedProps);
+        if (info.href || info.gameId) return info;
+    }
+    return {};
+}
+
+cards.forEach((card, index) => {
+    if (!card.querySelector("div[style*='border-color: rgb(54, 177, 230)']")) return;
+    const title = card.querySelector("p[class*='MuiTypography-subtitle1']");
+    const anchor = card.querySelector("a[href]");
+    const tagged = card.querySelector("[data-href], [data-url], [data-game-id]") || card;
+    let href = anchor ? anchor.href : (tagged.dataset.href || tagged.dataset.url || null);
+    let gameId = tagged.dataset.gameId || null;
+    if (!href) {
+        const button = card.querySelector("button[class*='MuiCardActionArea-root']") || card;
+        const info = fromReact(button);
+        href = info.href;
+        gameId = gameId || info.gameId;
+    }
+    found.push({
+        index: index,
+        name: title ? title.textContent.trim() : '',
+        href: href ? new URL(href, window.location.href).href : null,
+        game_id: gameId === null ? null : String(gameId)
+    });
+});
+return found;
+"""
+
+def _load_list_page(driver, base_url):
+    """Load the games list and wait for its cards to finish rendering"""
+    with METRICS.timer('page_load'):
+        driver.get(base_url)
+    wait_for_network_idle(driver, "list page network idle")
+    wait_for_stable_count(driver, CARD_XPATH, "list page cards")
+    record_page_weight(driver)
+
+def _click_next_page(driver, wait, next_button=None):
+    """Click 'Goto Next page' and wait until the new cards have rendered"""
+    before = driver.execute_script(CARD_TITLES_JS)
+    if next_button is None:
+        next_button = timed_until(
+            wait,
+            EC.element_to_be_clickable((By.XPATH, NEXT_PAGE_XPATH)),
+            "next page button"
+        )
+    next_button.click()
+    wait_for_change(driver, CARD_TITLES_JS, before, "list page change")
+    wait_for_stable_count(driver, CARD_XPATH, "list page cards")
+
+def _goto_list_page(driver, wait, base_url, page):
+    """Reload the games list and click forward to the given page"""
+    _load_list_page(driver, base_url)
+    for _ in range(page - 1):
+        _click_next_page(driver, wait)
+
+def _click_card_for_url(driver, wait, base_url, current_page, idx):
+    """Click the card at idx and return (name, url), then go back to the list page"""
+    try:
+        card = driver.find_elements(By.XPATH, CARD_XPATH)[idx]
+        game_name = card.find_element(
+            By.XPATH,
+            ".//p[contains(@class, 'MuiTypography-subtitle1')]"
+        ).text.strip()
+        button = card.find_element(
+            By.XPATH,
+            ".//button[contains(@class, 'MuiCardActionArea-root')]"
+        )
+        list_url = driver.current_url
+        button.click()
+        return game_name, wait_for_url_change(driver, list_url, "card navigation")
+    finally:
+        _goto_list_page(driver, wait, base_url, current_page)
+
+def _find_active_card_indices(driver):
+    """Return the indices of cards carrying the blue 'active' banner"""
+    active_indices = []
+    cards = driver.find_elements(By.XPATH, CARD_XPATH)
+    for idx, card in enumerate(cards):
+        try:
+            card.find_element(
+                By.XPATH,
+                ".//div[contains(@style, 'border-color: rgb(54, 177, 230)')]"
+            )
+            active_indices.append(idx)
+        except NoSuchElementException:
+            continue
+    return active_indices
+
+def _read_active_cards(driver, discovery):
+    """List the active cards on the current page as dicts of index/name/href/game_id.
+
+    In 'click' mode (or if the script fails) no links are resolved, so every
+    card goes through the click fallback.
+    """
+    if discovery == "direct":
+        try:
+            return driver.execute_script(ACTIVE_CARDS_JS) or []
+        except Exception as e:
+            print(f"Direct card discovery failed, falling back to clicks: {str(e)}")
+    return [
+        {'index': idx, 'name': '', 'href': None, 'game_id': None}
+        for idx in _find_active_card_indices(driver)
+    ]
+
+def get_game_urls(driver, wait, base_url=BASE_URL, max_page=None,
+                  discovery="direct"):
     """First phase: Collect all active game URLs from the paginated list.
        If max_page is provided, only pages through that number are scraped.
+
+       With discovery='direct' the links of all active cards on a page are read
+       in one pass and the list is paged forward only once; cards whose link
+       can't be resolved fall back to the click-and-return path, which is the
+       only path used with discovery='click'.
     """
     game_urls = set()
     current_page = 1
-    
+    url_template = None  # e.g. ".../games/{game_id}", learned from a clicked card
+
+    _load_list_page(driver, base_url)
+
     while True:
         print(f"\nProcessing page {current_page}")
         
-        # Load the games list page (only for first page)
-        if current_page == 1:
-            driver.get(base_url)
-        
-        # Wait for page to fully load
-        time.sleep(3)
-        
         try:
-            # Wait for page to load and cards to be present
-            wait.until(
-                EC.presence_of_element_located((
-                    By.XPATH,
-                    "//div[contains(@class, 'MuiCard-root')]"
-                ))
-            )
-            time.sleep(2)  # Extra wait for cards to settle
-
-            # Find all active game cards and store their indices
-            active_indices = []
-            cards = driver.find_elements(By.XPATH, "//div[contains(@class, 'MuiCard-root')]")
-            
-            for idx, card in enumerate(cards):
-                try:
-                    # Check if card has blue banner
-                    card.find_element(
-                        By.XPATH,
-                        ".//div[contains(@style, 'border-color: rgb(54, 177, 230)')]"
-                    )
-                    active_indices.append(idx)
-                except NoSuchElementException:
-                    continue
-
-            if not active_indices:
+            active_cards = _read_active_cards(driver, discovery)
+            if not active_cards:
                 print("No active games found on this page")
                 break
 
-            # Process each active card by index
             found_new_games = False
-            for idx in active_indices:
+            unresolved = []
+            resolved = []  # Card links for the page recorder
+            for card in active_cards:
+                game_url = card['href']
+                if not game_url and card['game_id'] and url_template:
+                    game_url = url_template.format(game_id=card['game_id'])
+                if not game_url:
+                    unresolved.append(card)
+                    continue
+                resolved.append({'index': card['index'], 'href': game_url})
+                if game_url != base_url and game_url not in game_urls:
+                    game_urls.add(game_url)
+                    found_new_games = True
+                    print(f"Found active game: {card['name']} -> {game_url}")
+
+            # Click through only the cards we couldn't resolve directly
+            for card in unresolved:
                 try:
-                    # Get fresh card element
-                    cards = driver.find_elements(By.XPATH, "//div[contains(@class, 'MuiCard-root')]")
-                    card = cards[idx]
-                    
-                    # Get game name
-                    game_name = card.find_element(
-                        By.XPATH,
-                        ".//p[contains(@class, 'MuiTypography-subtitle1')]"
-                    ).text.strip()
-                    
-                    # Click the button
-                    button = card.find_element(
-                        By.XPATH,
-                        ".//button[contains(@class, 'MuiCardActionArea-root')]"
+                    game_name, game_url = _click_card_for_url(
+                        driver, wait, base_url, current_page, card['index']
                     )
-                    button.click()
-                    time.sleep(2)
-                    
-                    # Get URL
-                    game_url = driver.current_url
+                    if card['game_id'] and card['game_id'] in game_url:
+                        url_template = game_url.replace(card['game_id'], '{game_id}')
+                    resolved.append({'index': card['index'], 'href': game_url})
                     if game_url != base_url and game_url not in game_urls:
                         game_urls.add(game_url)
                         found_new_games = True
                         print(f"Found active game: {game_name} -> {game_url}")
-
-                    # Return to games list and wait for page to load
-                    driver.get(base_url)
-                    time.sleep(2)
-                    wait.until(
-                        EC.presence_of_element_located((
-                            By.XPATH,
-                            "//div[contains(@class, 'MuiCard-root')]"
-                        ))
-                    )
-                    
-                    # If we're past page 1, click through to the current page
-                    if current_page > 1:
-                        for _ in range(current_page - 1):
-                            next_button = wait.until(
-                                EC.element_to_be_clickable((
-                                    By.XPATH,
-                                    "//button[@aria-label='Goto Next page']"
-                                ))
-                            )
-                            next_button.click()
-                            time.sleep(2)
-                        time.sleep(2)  # Extra wait for page to settle
-
                 except Exception as e:
-                    print(f"Error with game at index {idx}: {str(e)}")
-                    # Return to correct page
-                    driver.get(base_url)
-                    time.sleep(2)
-                    if current_page > 1:
-                        for _ in range(current_page - 1):
-                            next_button = wait.until(
-                                EC.element_to_be_clickable((
-                                    By.XPATH,
-                                    "//button[@aria-label='Goto Next page']"
-                                ))
-                            )
-                            next_button.click()
-                            time.sleep(2)
+                    print(f"Error with game at index {card['index']}: {str(e)}")
                     continue
 
+            RECORDER.save_list_page(driver, base_url, current_page, resolved)
+
             # If a max_page is specified and we've reached that page, stop scraping further pages.
             if max_page is not None and current_page >= max_page:
                 print(f"Reached specified max page {max_page}.")
                 break
 
             # Check for next page
-            next_button = wait.until(
-                EC.element_to_be_clickable((
-                    By.XPATH,
-                    "//button[@aria-label='Goto Next page']"
-                ))
+            next_button = timed_until(
+                wait,
+                EC.element_to_be_clickable((By.XPATH, NEXT_PAGE_XPATH)),
+                "next page button"
             )
             
             if 'Mui-disabled' in next_button.get_attribute('class'):
@@ -159,9 +260,8 @@ def get_game_urls(driver, wait, base_url="https://azplayersclub.com/games/types/
                 
             if found_new_games:
                 print(f"Moving to page {current_page + 1}")
-                next_button.click()
+                _click_next_page(driver, wait, next_button)
                 current_page += 1
-                time.sleep(3)  # Wait for page transition
             else:
                 print("No new games found on this page")
                 break
@@ -173,166 +273,416 @@ def get_game_urls(driver, wait, base_url="https://azplayersclub.com/games/types/
     print(f"\nFound {len(game_urls)} active games")
     return list(game_urls)
 
-def parse_prize_amount(text):
-    """
-    Convert a prize amount string (which might contain words like 'Million' or 'Thousand')
-    into a float. For example, '5 Million' becomes 5000000.0.
+# Collects the header fields and the whole prize table in one round trip.
+# Returns null when the prize table isn't there so the caller can fall back
+# to the per-element lookups.
+GAME_DETAILS_JS = r"""
+function first(xpath) {
+    return document.evaluate(xpath, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+const table = first("//table[.//th[contains(., 'Prize Amount')]]");
+if (!table) return null;
+const text = el => el ? el.innerText.trim() : null;
+const image = first("//div[contains(@class, 'MuiCardMedia-root') and contains(@style, 'background-image')]");
+return {
+    name: text(first("//h1[contains(@class, 'MuiTypography')]")),
+    cost: text(first("//span[contains(@class, 'MuiTypography-h6') and contains(text(), '$')]")),
+    odds: text(first("//div[.//p[contains(text(), 'Overall Odds')]]")),
+    style: image ? image.getAttribute('style') : null,
+    rows: Array.from(table.querySelectorAll('tbody tr')).map(row =>
+        Array.from(row.querySelectorAll('td')).slice(0, 3).map(td => text(td.querySelector('p'))))
+};
+"""
+
+def _parse_image_url(style_attr):
+    """Pull the image URL out of a background-image style attribute"""
+    if not style_attr:
+        return None
+    # Convert any HTML-encoded quotes to normal quotes if necessary
+    style_attr = style_attr.replace("&quot;", "\"")
+    match = re.search(r'url\("(.+?)"\)', style_attr)
+    return match.group(1) if match else None
+
+def _parse_prize_rows(rows):
+    """Parse (prize, total, remaining) text triples into the three prize lists"""
+    prize_amounts = []
+    total_prizes = []
+    remaining_prizes = []
+
+    for prize_text, total_text, remaining_text in rows:
+        try:
+            prize = parse_prize_amount(prize_text)
+            total = int(total_text.replace(",", ""))
+            remaining = int(remaining_text.replace(",", ""))
+            prize_amounts.append(prize)
+            total_prizes.append(total)
+            remaining_prizes.append(remaining)
+        except Exception as row_error:
+            print(f"Error processing row: {row_error}")
+            continue
+
+    return prize_amounts, total_prizes, remaining_prizes
+
+def extract_game_details_batched(driver):
+    """Read a game page with a single execute_script call.
+
+    Returns (name, cost, odds, image_url, rows) or None if the page isn't
+    laid out as expected.
     """
-    s = text.replace("$", "").replace(",", "").strip().lower()
-    if "million" in s:
-        number_str = s.replace("million", "").strip()
-        return float(number_str) * 1_000_000
-    elif "thousand" in s:
-        number_str = s.replace("thousand", "").strip()
-        return float(number_str) * 1_000
-    else:
-        return float(s)
+    payload = driver.execute_script(GAME_DETAILS_JS)
+    if not payload or not payload['name'] or not payload['cost'] or not payload['odds']:
+        return None
+    odds_match = re.search(r"1 in ([\d.]+)", payload['odds'])
+    if not odds_match:
+        return None
+    rows = [
+        tuple(cell or "" for cell in row)
+        for row in payload['rows']
+        if len(row) == 3
+    ]
+    return (
+        payload['name'],
+        float(payload['cost'].replace("$", "")),
+        float(odds_match.group(1)),
+        _parse_image_url(payload['style']),
+        rows
+    )
 
-def scrape_game_details(driver, wait, url):
-    """Scrape details for a single game with new data structure"""
-    driver.get(url)
-    time.sleep(3)
+def extract_game_details_by_element(driver, wait):
+    """Read a game page one element at a time; slower fallback for the batched extractor"""
+    # Get game name
+    name = timed_until(
+        wait,
+        EC.presence_of_element_located((
+            By.XPATH,
+            "//h1[contains(@class, 'MuiTypography')]"
+        )),
+        "game name"
+    ).text.strip()
+
+    # Get cost
+    cost = float(timed_until(
+        wait,
+        EC.presence_of_element_located((
+            By.XPATH,
+            "//span[contains(@class, 'MuiTypography-h6') and contains(text(), '$')]"
+        )),
+        "game cost"
+    ).text.strip().replace("$", ""))
 
+    # Get odds
+    odds_element = timed_until(
+        wait,
+        EC.presence_of_element_located((
+            By.XPATH,
+            "//div[.//p[contains(text(), 'Overall Odds')]]"
+        )),
+        "game odds"
+    )
+    odds = float(re.search(r"1 in ([\d.]+)", odds_element.text).group(1))
+
+    # Get game image URL from the background-image style attribute
     try:
-        # Get game name
-        name = wait.until(
+        image_element = timed_until(
+            wait,
             EC.presence_of_element_located((
                 By.XPATH,
-                "//h1[contains(@class, 'MuiTypography')]"
-            ))
-        ).text.strip()
-        print(f"Processing: {name}")
+                "//div[contains(@class, 'MuiCardMedia-root') and contains(@style, 'background-image')]"
+            )),
+            "game image"
+        )
+        image_url = _parse_image_url(image_element.get_attribute("style"))
+    except Exception as e:
+        print("Error fetching image URL:", e)
+        image_url = None
 
-        # Get cost
-        cost = float(wait.until(
-            EC.presence_of_element_located((
-                By.XPATH,
-                "//span[contains(@class, 'MuiTypography-h6') and contains(text(), '$')]"
+    # Get prize table rows
+    table = timed_until(
+        wait,
+        EC.presence_of_element_located((
+            By.XPATH,
+            "//table[.//th[contains(., 'Prize Amount')]]"
+        )),
+        "prize table"
+    )
+    rows = []
+    for row in table.find_elements(By.XPATH, ".//tbody/tr"):
+        try:
+            rows.append(tuple(
+                row.find_element(By.XPATH, f".//td[{i}]//p").text.strip()
+                for i in (1, 2, 3)
             ))
-        ).text.strip().replace("$", ""))
+        except Exception as row_error:
+            print(f"Error processing row: {row_error}")
+            continue
 
-        # Get odds
-        odds_element = wait.until(
-            EC.presence_of_element_located((
-                By.XPATH,
-                "//div[.//p[contains(text(), 'Overall Odds')]]"
-            ))
-        )
-        odds = float(re.search(r"1 in ([\d.]+)", odds_element.text).group(1))
+    return name, cost, odds, image_url, rows
+
+def scrape_game_details(driver, wait, url):
+    """Scrape details for a single game with new data structure"""
+    with METRICS.game(url) as game:
+        with METRICS.timer('page_load'):
+            driver.get(url)
+        wait_for_stable_count(driver, PRIZE_ROWS_XPATH, "prize table rows")
+        record_page_weight(driver)
+        discard_network_log(driver)
 
-        # Get game image URL from the background-image style attribute
         try:
-            image_element = wait.until(
-                EC.presence_of_element_located((
-                    By.XPATH,
-                    "//div[contains(@class, 'MuiCardMedia-root') and contains(@style, 'background-image')]"
-                ))
-            )
-            style_attr = image_element.get_attribute("style")
-            # Convert any HTML-encoded quotes to normal quotes if necessary
-            style_attr = style_attr.replace("&quot;", "\"")
-            match = re.search(r'url\("(.+?)"\)', style_attr)
-            if match:
-                image_url = match.group(1)
-            else:
-                image_url = None
-        except Exception as e:
-            print("Error fetching image URL:", e)
-            image_url = None
+            with METRICS.timer('parse'):
+                details = None
+                try:
+                    details = extract_game_details_batched(driver)
+                except Exception as e:
+                    print(f"Batched extraction failed: {str(e)}")
+                if details is None:
+                    METRICS.count('element_fallbacks')
+                    details = extract_game_details_by_element(driver, wait)
 
-        # Get prize table rows
-        table = wait.until(
-            EC.presence_of_element_located((
-                By.XPATH,
-                "//table[.//th[contains(., 'Prize Amount')]]"
-            ))
-        )
-        rows = table.find_elements(By.XPATH, ".//tbody/tr")
-
-        # Collect prize tier data
-        prize_amounts = []
-        total_prizes = []
-        remaining_prizes = []
-
-        for row in rows:
-            try:
-                prize_text = row.find_element(By.XPATH, ".//td[1]//p").text.strip()
-                prize = parse_prize_amount(prize_text)
-                total = int(row.find_element(By.XPATH, ".//td[2]//p").text.strip().replace(",", ""))
-                remaining = int(row.find_element(By.XPATH, ".//td[3]//p").text.strip().replace(",", ""))
-                prize_amounts.append(prize)
-                total_prizes.append(total)
-                remaining_prizes.append(remaining)
-            except Exception as row_error:
-                print(f"Error processing row: {row_error}")
-                continue
-
-        return {
-            'name': name,
-            'cost': cost,
-            'odds': odds,
-            'prize_amounts': prize_amounts,
-            'total_prizes': total_prizes,
-            'remaining_prizes': remaining_prizes,
-            'scrape_time': datetime.utcnow().isoformat(),
-            'image_url': image_url  # New field added for the image URL
-        }
+                name, cost, odds, image_url, rows = details
+                game['name'] = name
+                print(f"Processing: {name}")
+                prize_amounts, total_prizes, remaining_prizes = _parse_prize_rows(rows)
 
-    except Exception as e:
-        print(f"Error scraping {url}: {str(e)}")
-        driver.save_screenshot(f"error_{url.split('/')[-1]}.png")
-        return None
+            RECORDER.save_game_page(driver, url)
 
-def scrape_scratcher_data_selenium(max_page=None, headless=False):
-    """Main function to coordinate the scraping process"""
-    from webdriver_manager.chrome import ChromeDriverManager
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
+            METRICS.count('games_scraped')
+            return {
+                'name': name,
+                'cost': cost,
+                'odds': odds,
+                'prize_amounts': prize_amounts,
+                'total_prizes': total_prizes,
+                'remaining_prizes': remaining_prizes,
+                'scrape_time': datetime.utcnow().isoformat(),
+                'image_url': image_url,  # New field added for the image URL
+                'url': url
+            }
 
-    options = webdriver.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    
-    # Universal headless configuration
-    if headless or os.getenv('GITHUB_ACTIONS'):
-        options.add_argument('--headless=new')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36')
+        except Exception as e:
+            print(f"Error scraping {url}: {str(e)}")
+            METRICS.count('games_failed')
+            driver.save_screenshot(f"error_{url.split('/')[-1]}.png")
+            return None
+
+def create_driver(headless=False, lean=False, attach=False, network_log=False):
+    """Start a Chrome WebDriver configured for scraping.
+
+    lean=True blocks images, fonts, stylesheets and analytics, turns off
+    unneeded browser features and keeps a persistent profile and disk cache
+    between runs (see lean_browser.py).
+    attach=True attaches to a warm browser of a running browser service
+    instead (see browser_service.py), falling back to starting one.
+    network_log=True records CDP network events for
+    wait_engine.wait_for_network_idle; only the list pages need them.
+    """
+    start = time.perf_counter()
+    driver = None
+    if attach:
+        options = webdriver.ChromeOptions()
+        if network_log:
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        driver = attach_driver(options)
+        if driver is None:
+            print("No free browser in the browser service, starting one")
+
+    if driver is not None:
+        METRICS.count('driver_attached')
     else:
-        options.add_argument('--start-maximized')
+        options = webdriver.ChromeOptions()
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        if network_log:
+            # CDP network events feed wait_engine.wait_for_network_idle
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
-    try:
-        # Automatic driver management
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        
-        # Platform-specific tweaks
-        if platform.system() == 'Windows':
-            driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-            })
+        # Universal headless configuration
+        if headless or os.getenv('GITHUB_ACTIONS'):
+            options.add_argument('--headless=new')
+            options.add_argument('--window-size=1920,1080')
+            options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36')
+        else:
+            options.add_argument('--start-maximized')
+
+        if lean:
+            apply_lean_options(options)
+
+        # Pinned driver path, so only the first run looks up a driver version online
+        try:
+            driver = webdriver.Chrome(service=Service(pinned_driver_path()), options=options)
+        except SessionNotCreatedException:
+            # Chrome was probably updated past the pinned driver
+            driver = webdriver.Chrome(service=Service(pinned_driver_path(refresh=True)), options=options)
+        METRICS.count('driver_cold_starts')
+    METRICS.record('driver_start', time.perf_counter() - start)
+    driver.network_log = network_log
+
+    # Platform-specific tweaks
+    if platform.system() == 'Windows':
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+            "userAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+        })
+    if lean:
+        block_resources(driver)
+    return driver
 
+def scrape_scratcher_data_selenium(max_page=None, headless=False, discovery="direct", workers=1, rate=1.0,
+                                   engine="selenium", adaptive=False, metrics_path=None, base_url=BASE_URL,
+                                   fresh=False, discovery_ttl=DISCOVERY_TTL, lean=False, attach=False):
+    """Main function to coordinate the scraping process.
+
+    With workers > 1, game details are scraped by a pool of headless drivers
+    (see worker_pool.py), limited to `rate` requests per second per host.
+    With engine='http', game details are fetched as plain HTML over pooled
+    connections (see http_scraper.py) and only pages that can't be parsed
+    that way are loaded in the browser.
+    With adaptive=True, only games the scheduler considers due are scraped
+    (see scrape_scheduler.py).
+    Phase timings and counters are written as JSON lines to metrics_path
+    (see scrape_metrics.py). base_url is the games list page, e.g. a local
+    replay of a recorded run (see page_replay.py).
+    Progress is checkpointed per URL in the crawl queue (see crawl_queue.py):
+    a run started within discovery_ttl of the last discovery skips it and
+    only scrapes URLs that haven't finished, or all of them again if the
+    last crawl finished, unless fresh=True.
+    With lean=True, browsers skip every resource the scrape doesn't read
+    (see create_driver); bytes downloaded and load times are reported either way.
+    With attach=True, drivers attach to the browser service's warm browsers.
+    """
+    run_start = time.monotonic()
+    WAIT_STATS.add_listener(METRICS.on_wait)
+    try:
+        # This driver discovers the games, so it records network events for the list pages
+        driver = create_driver(headless, lean=lean, attach=attach, network_log=True)
         wait = WebDriverWait(driver, 30)
 
         init_db()  # Initialize database
+        crawl = CrawlQueue()
         
         try:
-            # Phase 1: Get all game URLs
-            print("Collecting active game URLs...")
-            urls = get_game_urls(driver, wait, max_page=max_page)
-
-            # Phase 2: Scrape each game's details and store directly in DB
-            for url in urls:
-                results = scrape_game_details(driver, wait, url)
-                if results:
-                    # Store in database
-                    store_scraper_data(results)
-                    print(f"Stored in DB: {results['name']}, ${results['prize_amounts'][0]}")
+            # Phase 1: Get all game URLs, unless they were discovered recently
+            urls = None if fresh else crawl.cached_urls(discovery_ttl)
+            if urls and any(urlparse(url).netloc != urlparse(base_url).netloc for url in urls):
+                urls = None  # Cached from another site, e.g. the live one before a replay
+            if urls and crawl.unfinished():
+                print(f"Resuming crawl of {len(urls)} recently discovered games")
+            elif urls and not adaptive:
+                # The last crawl finished: scrape the same games again without rediscovering them
+                print(f"Re-scraping {len(urls)} recently discovered games")
+                crawl.restart()
+            else:
+                # An adaptive crawl only holds the games that were due, so it isn't reused
+                print("Collecting active game URLs...")
+                with METRICS.timer('discovery'):
+                    urls = get_game_urls(driver, wait, base_url=base_url, max_page=max_page, discovery=discovery)
+                METRICS.count('urls_discovered', len(urls))
+                if adaptive:
+                    urls = due_urls(urls)
+                crawl.reset(urls)
+            METRICS.count('urls_scheduled', len(urls))
+
+            # Phase 2: Scrape each game's details; one writer batches them into the DB
+            # and marks them done in the crawl queue once committed
+            with ScraperDataWriter(batch_size=WRITE_BATCH_SIZE,
+                                   on_written=lambda records: crawl.mark_done(r['url'] for r in records)) as writer:
+                def store_and_report(results):
+                    with METRICS.timer('db_write'):
+                        writer.add(results)
+                    print(f"Scraped: {results['name']} ({len(results['prize_amounts'])} prize tiers)")
+
+                while True:
+                    urls = crawl.ready()
+                    if not urls:
+                        # Retry failures in this run while their backoff is short
+                        delay = crawl.next_retry_delay()
+                        if delay is None or delay > MAX_INLINE_RETRY_WAIT:
+                            break
+                        print(f"Retrying failed games in {delay:.0f}s")
+                        time.sleep(delay)
+                        continue
+                    # Claim each URL as it is dispatched, so ones an interrupted run never reached
+                    # keep their attempts; HTTP failures handed to the browser count only once
+                    claimed = set()
+
+                    def claim(url):
+                        if url not in claimed:
+                            claimed.add(url)
+                            crawl.claim([url])
+
+                    if engine == "http":
+                        urls = fetch_all_game_details(urls, store_and_report, workers=max(workers, 4), rate=rate,
+                                                      claim_fn=claim)
+
+                    if workers > 1 and urls:
+                        # The pool starts its own drivers; free this one first
+                        if driver is not None:
+                            driver.quit()
+                            driver = None
+                        run_worker_pool(
+                            urls,
+                            driver_factory=lambda: create_driver(headless=True, lean=lean, attach=attach),
+                            scrape_fn=scrape_game_details,
+                            store_fn=store_and_report,
+                            workers=workers,
+                            rate=rate,
+                            fail_fn=crawl.mark_failed,
+                            claim_fn=claim
+                        )
+                    else:
+                        for url in urls:
+                            if getattr(driver, 'exhausted', False):
+                                # An attached browser reached the service's recycle limit; hand it back
+                                print("Browser served its page limit, attaching to another")
+                                METRICS.count('browser_recycles')
+                                driver.quit()
+                                driver = None
+                                driver = create_driver(headless, lean=lean, attach=attach)
+                                wait = WebDriverWait(driver, 30)
+                            claim(url)
+                            try:
+                                results = scrape_game_details(driver, wait, url)
+                            except Exception as e:
+                                print(f"Error scraping {url}: {str(e)}")
+                                crawl.mark_failed(url, e)
+                                if not driver_alive(driver):
+                                    # Start a new browser and carry on with the next URL
+                                    print("Browser died, starting a new one")
+                                    METRICS.count('browser_restarts')
+                                    try:
+                                        driver.quit()
+                                    except Exception:
+                                        pass
+                                    driver = None
+                                    driver = create_driver(headless, lean=lean, attach=attach)
+                                    wait = WebDriverWait(driver, 30)
+                                continue
+                            if results:
+                                store_and_report(results)
+                            else:
+                                crawl.mark_failed(url, "no data scraped")
+
+                    with METRICS.timer('db_write'):
+                        writer.flush()
+                    if not claimed:
+                        # Nothing could be dispatched (e.g. no browser would start), so don't spin
+                        print(f"Could not start scraping {len(urls)} games; stopping")
+                        break
+
+            writer.report()
+            crawl.report()
+            update_schedules(writer.written)
 
         finally:
-            driver.quit()
+            if driver is not None:
+                driver.quit()
             print("\nScraping completed! Data stored in database.")
+            print_wait_summary(time.monotonic() - run_start)
+            METRICS.print_summary()
+            report_page_weight(lean)
+            path = METRICS.write(metrics_path or default_metrics_path(), engine=engine,
+                                 workers=workers, discovery=discovery, adaptive=adaptive, lean=lean, attach=attach)
+            print(f"Metrics written to {path}")
 
     except Exception as e:
         print(f"Error in scrape_scratcher_data_selenium: {str(e)}")
@@ -341,7 +691,69 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scraper for Arizona Lottery Scratcher Data")
     parser.add_argument("--page", type=int, help="Scrape up to specified page number (if omitted, scrape all pages)")
     parser.add_argument("--headless", action='store_true', help="Run browser in headless mode")
+    parser.add_argument("--discovery", choices=["direct", "click"], default="direct",
+                        help="How to find game URLs: read card links in one pass (direct) or click every card (click)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of headless browsers (or HTTP connections, at least 4) scraping game details in parallel")
+    parser.add_argument("--engine", choices=["selenium", "http"], default="selenium",
+                        help="Fetch game detail pages in the browser (selenium) or over plain HTTP (http)")
+    parser.add_argument("--adaptive", action='store_true',
+                        help="Only scrape games that are due based on how fast their prizes are being claimed")
+    parser.add_argument("--max-wait", type=float, help="Upper bound in seconds for each page readiness wait (default 15)")
+    parser.add_argument("--settle", type=float, help="Seconds a readiness signal must stay unchanged (default 0.5)")
+    parser.add_argument("--rate", type=float, default=1.0, help="Maximum detail page requests per second to the site (0 = unlimited)")
+    parser.add_argument("--metrics", help="Where to write the run's JSON lines metrics (default metrics/scrape-<time>.jsonl)")
+    parser.add_argument("--profile", action='store_true',
+                        help="Run under cProfile and save the stats next to the metrics file (main thread only)")
+    parser.add_argument("--base-url", default=BASE_URL, help="Games list page to start from (default the live site)")
+    parser.add_argument("--record", help="Save every rendered list and game page into this directory for replay")
+    parser.add_argument("--replay", help="Scrape a recording made with --record from a local server instead of the site")
+    parser.add_argument("--latency", type=float, default=0.0, help="With --replay, seconds to delay every response")
+    parser.add_argument("--db", help=f"SQLite database to write to (default {db_handler.DB_PATH})")
+    parser.add_argument("--lean", action='store_true',
+                        help="Block images, fonts, stylesheets and analytics and reuse a persistent browser profile")
+    parser.add_argument("--fresh", action='store_true',
+                        help="Rediscover game URLs and start a new crawl instead of resuming the last one")
+    parser.add_argument("--discovery-ttl", type=float, default=DISCOVERY_TTL.total_seconds() / 3600,
+                        help="Hours a discovered URL set is reused by later runs (default %(default)g)")
+    parser.add_argument("--attach", action='store_true',
+                        help="Use warm browsers from a running browser_service.py instead of starting new ones")
     args = parser.parse_args()
     
+    configure_waits(max_wait=args.max_wait, settle_time=args.settle)
+    metrics_path = args.metrics or default_metrics_path()
+    if args.db:
+        db_handler.DB_PATH = args.db
+    if args.record:
+        RECORDER.start(args.record)
+    base_url = args.base_url
+    if args.replay:
+        replay_server, base_url = start_replay_server(args.replay, latency=args.latency)
+        print(f"Replaying {args.replay} at {base_url}")
     print("Starting scraper...")
-    scrape_scratcher_data_selenium(max_page=args.page, headless=args.headless)
+    run = lambda: scrape_scratcher_data_selenium(
+        max_page=args.page,
+        headless=args.headless,
+        discovery=args.discovery,
+        workers=args.workers,
+        rate=args.rate,
+        engine=args.engine,
+        adaptive=args.adaptive,
+        metrics_path=metrics_path,
+        base_url=base_url,
+        fresh=args.fresh,
+        discovery_ttl=timedelta(hours=args.discovery_ttl),
+        lean=args.lean,
+        attach=args.attach
+    )
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.runcall(run)
+        profile_path = os.path.splitext(metrics_path)[0] + '.prof'
+        profiler.dump_stats(profile_path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        print(f"Profile saved to {profile_path} (open with python -m pstats)")
+    else:
+        run()
+
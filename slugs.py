@@ -0,0 +1,8 @@
+import re
+
+def generate_slug(name):
+    """URL slug for a game name; must match generateSlug() in public/js"""
+    slug = name.lower()
+    slug = re.sub(r'[^A-Za-z0-9_\s-]', '', slug)
+    slug = re.sub(r'[\s_-]+', '-', slug)
+    return slug.strip('-')
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException
+
+# Upper bounds for every adaptive wait; see configure()
+MAX_WAIT = 15.0      # Longest any single wait may take, in seconds
+SETTLE_TIME = 0.5    # How long a signal must stay unchanged to count as settled
+POLL_INTERVAL = 0.1
+
+COUNT_XPATH_JS = """
+return document.evaluate(arguments[0], document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+"""
+
+# Falls back to the Resource Timing API when CDP performance logs aren't available
+RESOURCE_COUNT_JS = "return performance.getEntriesByType('resource').length;"
+
+class WaitStats:
+    """Thread-safe record of how long each adaptive wait actually took"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_label = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """Also pass every recorded wait to listener(label, seconds, timed_out)"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def record(self, label, seconds, timed_out=False):
+        with self._lock:
+            self.by_label[label].append(seconds)
+            if timed_out:
+                self.timeouts[label] += 1
+        for listener in self.listeners:
+            listener(label, seconds, timed_out)
+
+    @property
+    def total(self):
+        with self._lock:
+            return sum(sum(values) for values in self.by_label.values())
+
+    def reset(self):
+        with self._lock:
+            self.by_label.clear()
+            self.timeouts.clear()
+
+WAIT_STATS = WaitStats()
+
+def configure(max_wait=None, settle_time=None):
+    """Override the default upper bound and settle time for all waits"""
+    global MAX_WAIT, SETTLE_TIME
+    if max_wait is not None:
+        MAX_WAIT = max_wait
+    if settle_time is not None:
+        SETTLE_TIME = settle_time
+
+def _wait_for_settled(label, read_value, is_ready, max_wait, settle_time, stats):
+    """Poll read_value() until it is ready and unchanged for settle_time seconds.
+
+    Returns the settled value, or the last value seen if max_wait runs out.
+    """
+    max_wait = MAX_WAIT if max_wait is None else max_wait
+    settle_time = SETTLE_TIME if settle_time is None else settle_time
+    start = time.monotonic()
+    deadline = start + max_wait
+    last_value = read_value()
+    last_change = start
+    while True:
+        now = time.monotonic()
+        if is_ready(last_value) and now - last_change >= settle_time:
+            stats.record(label, now - start)
+            return last_value
+        if now >= deadline:
+            stats.record(label, now - start, timed_out=True)
+            print(f"Wait '{label}' hit its {max_wait:.0f}s limit")
+            return last_value
+        time.sleep(POLL_INTERVAL)
+        value = read_value()
+        if value != last_value:
+            last_value = value
+            last_change = time.monotonic()
+
+def wait_for_stable_count(driver, xpath, label, min_count=1, max_wait=None, settle_time=None, stats=WAIT_STATS):
+    """Wait until at least min_count nodes match xpath and the count stops changing"""
+    return _wait_for_settled(
+        label,
+        lambda: driver.execute_script(COUNT_XPATH_JS, xpath),
+        lambda count: count >= min_count,
+        max_wait, settle_time, stats
+    )
+
+def wait_for_change(driver, script, previous, label, max_wait=None, stats=WAIT_STATS):
+    """Wait until the value returned by script differs from previous, e.g. after a page change"""
+    return _wait_for_settled(
+        label,
+        lambda: driver.execute_script(script),
+        lambda value: value != previous,
+        max_wait, 0, stats
+    )
+
+def wait_for_url_change(driver, old_url, label, max_wait=None, stats=WAIT_STATS):
+    """Wait for a click to navigate away from old_url; returns the new URL"""
+    return _wait_for_settled(
+        label,
+        lambda: driver.current_url,
+        lambda url: url != old_url,
+        max_wait, 0, stats
+    )
+
+def wait_for_stable_count_js(driver, script, label, max_wait=None, settle_time=None, stats=WAIT_STATS):
+    """Wait until the number returned by script stops changing"""
+    return _wait_for_settled(label, lambda: driver.execute_script(script), lambda count: True,
+                             max_wait, settle_time, stats)
+
+class _NetworkTracker:
+    """Tracks in-flight requests from Chrome's CDP performance log"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.in_flight = set()
+
+    def poll(self):
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            request_id = message.get('params', {}).get('requestId')
+            if method == 'Network.requestWillBeSent':
+                self.in_flight.add(request_id)
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                self.in_flight.discard(request_id)
+        return len(self.in_flight)
+
+def wait_for_network_idle(driver, label, max_wait=None, settle_time=None, stats=WAIT_STATS):
+    """Wait until no requests are in flight for settle_time seconds.
+
+    Uses the CDP network events in Chrome's performance log (enabled by
+    scraper.create_driver(network_log=True)); without them, waits for the
+    number of loaded resources to stop growing instead.
+    """
+    tracker = _NetworkTracker(driver)
+    try:
+        tracker.poll()
+    except Exception:
+        return wait_for_stable_count_js(driver, RESOURCE_COUNT_JS, label, max_wait, settle_time, stats)
+    return _wait_for_settled(label, tracker.poll, lambda in_flight: in_flight == 0,
+                             max_wait, settle_time, stats)
+
+def discard_network_log(driver):
+    """Drop the CDP events a network-logging driver has buffered, which chromedriver keeps until read"""
+    if getattr(driver, 'network_log', False):
+        try:
+            driver.get_log('performance')
+        except Exception:
+            pass
+
+def timed_until(wait, condition, label, stats=WAIT_STATS):
+    """WebDriverWait.until that records how long it waited"""
+    start = time.monotonic()
+    try:
+        result = wait.until(condition)
+    except TimeoutException:
+        stats.record(label, time.monotonic() - start, timed_out=True)
+        raise
+    stats.record(label, time.monotonic() - start)
+    return result
+
+def print_wait_summary(total_seconds, stats=WAIT_STATS):
+    """Print time spent waiting vs working, overall and per wait label"""
+    waited = stats.total
+    print("\nTime spent waiting vs working:")
+    print(f"- total run time: {total_seconds:.1f}s")
+    print(f"- waiting: {waited:.1f}s (summed over all drivers)")
+    print(f"- working: {max(total_seconds - waited, 0.0):.1f}s")
+    with stats._lock:
+        rows = sorted(stats.by_label.items(), key=lambda item: -sum(item[1]))
+        timeouts = dict(stats.timeouts)
+    for label, values in rows:
+        print(f"  {label}: {len(values)} waits, {sum(values):.1f}s total, "
+              f"{max(values):.2f}s max, {timeouts.get(label, 0)} hit the limit")
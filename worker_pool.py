@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+_STARTED = object()   # Result placeholder telling the writer a worker picked up a URL
+
+class HostRateLimiter:
+    """Thread-safe limiter allowing at most `rate` requests per second to each host"""
+
+    def __init__(self, rate=1.0):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to url's host is allowed; returns seconds slept"""
+        if not self.interval:
+            return 0.0
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+class WorkerStats:
+    """Per-worker counters used for the throughput report"""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.pages = 0
+        self.stored = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.throttled_seconds = 0.0
+        self.restarts = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def pages_per_minute(self):
+        return self.pages / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+def driver_alive(driver):
+    """Whether the browser behind driver still answers"""
+    try:
+        driver.execute_script('return 1')
+        return True
+    except Exception:
+        return False
+
+def _worker(worker_id, driver_factory, scrape_fn, url_queue, result_queue, limiter, stats, timeout):
+    """Scrape URLs from url_queue with a dedicated driver until the queue is empty"""
+    driver = None
+    try:
+        driver = driver_factory()
+        wait = WebDriverWait(driver, timeout)
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except queue.Empty:
+                break
+            if getattr(driver, 'exhausted', False):
+                # An attached browser reached the service's recycle limit; hand it back
+                print(f"[worker {worker_id}] Browser served its page limit, attaching to another")
+                driver.quit()
+                driver = None
+                driver = driver_factory()
+                wait = WebDriverWait(driver, timeout)
+            stats.throttled_seconds += limiter.wait(url)
+            result_queue.put((worker_id, url, _STARTED, None))
+            start = time.monotonic()
+            error = None
+            try:
+                result = scrape_fn(driver, wait, url)
+            except Exception as e:
+                print(f"[worker {worker_id}] Error scraping {url}: {str(e)}")
+                result = None
+                error = str(e)
+                if not driver_alive(driver):
+                    # Replace a crashed browser instead of failing every URL left
+                    print(f"[worker {worker_id}] Browser died, starting a new one")
+                    stats.restarts += 1
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = None
+                    driver = driver_factory()
+                    wait = WebDriverWait(driver, timeout)
+            stats.busy_seconds += time.monotonic() - start
+            stats.pages += 1
+            result_queue.put((worker_id, url, result, error))
+    except Exception as e:
+        print(f"[worker {worker_id}] Worker stopped: {str(e)}")
+    finally:
+        if driver is not None:
+            driver.quit()
+        stats.finished = time.monotonic()
+        result_queue.put((worker_id, None, None, None))  # Signals this worker is done
+
+def run_worker_pool(urls, driver_factory, scrape_fn, store_fn, workers=2, rate=1.0, timeout=30,
+                    fail_fn=None, claim_fn=None):
+    """Scrape urls with `workers` drivers in parallel and store results from a single writer.
+
+    driver_factory() must return a new WebDriver, scrape_fn(driver, wait, url)
+    returns a result dict or None, and claim_fn(url) (as a worker picks the
+    URL up), store_fn(result) and fail_fn(url, error) are only ever called
+    from the calling thread. Requests to each host are limited to `rate` per
+    second across all workers. Returns the list of WorkerStats.
+    """
+    url_queue = queue.Queue()
+    for url in urls:
+        url_queue.put(url)
+    result_queue = queue.Queue()
+    limiter = HostRateLimiter(rate)
+    stats = [WorkerStats(i) for i in range(workers)]
+
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(i, driver_factory, scrape_fn, url_queue, result_queue, limiter, stats[i], timeout),
+            name=f"scrape-worker-{i}",
+            daemon=True
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Single writer: only this thread touches the database
+    running = workers
+    while running:
+        worker_id, url, result, error = result_queue.get()
+        if url is None:
+            running -= 1
+            continue
+        if result is _STARTED:
+            if claim_fn is not None:
+                claim_fn(url)
+            continue
+        if result:
+            store_fn(result)
+            stats[worker_id].stored += 1
+        else:
+            stats[worker_id].failed += 1
+            if fail_fn is not None:
+                fail_fn(url, error or "no data scraped")
+
+    for thread in threads:
+        thread.join()
+
+    print_worker_report(stats)
+    return stats
+
+def print_worker_report(stats):
+    """Print per-worker and overall throughput"""
+    print("\nWorker throughput:")
+    for s in stats:
+        print(f"- worker {s.worker_id}: {s.pages} pages ({s.stored} stored, {s.failed} failed) "
+              f"in {s.elapsed:.1f}s, {s.pages_per_minute():.1f} pages/min, "
+              f"busy {s.busy_seconds:.1f}s, throttled {s.throttled_seconds:.1f}s, "
+              f"{s.restarts} browser restarts")
+    total_pages = sum(s.pages for s in stats)
+    wall = max((s.elapsed for s in stats), default=0.0)
+    if wall > 0:
+        print(f"Total: {total_pages} pages in {wall:.1f}s ({total_pages / wall * 60:.1f} pages/min)")